@@ -1,13 +1,16 @@
 import logging
 import pathlib
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
 
+from api.images import shutdown_pool
 from api.routes import cars, requests
+from api.static import PrecompressedStaticFiles, UploadsStaticFiles
+from bot.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -15,8 +18,26 @@ STATIC_DIR = pathlib.Path(__file__).resolve().parent / "static"
 UPLOADS_DIR = pathlib.Path(__file__).resolve().parent.parent / "uploads"
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.BOT_MODE != "webhook":
+        yield
+        shutdown_pool()
+        return
+
+    from bot.webhook import start_update_workers, stop_update_workers
+
+    await start_update_workers()
+    yield
+    await stop_update_workers()
+    shutdown_pool()
+
+
 def create_app() -> FastAPI:
-    app = FastAPI(title="AutoQuotes API")
+    if settings.BOT_MODE == "webhook" and not settings.WEBHOOK_SECRET:
+        raise RuntimeError("WEBHOOK_SECRET must be set when BOT_MODE=webhook")
+
+    app = FastAPI(title="AutoQuotes API", lifespan=lifespan)
 
     app.add_middleware(
         CORSMiddleware,
@@ -25,6 +46,19 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    @app.middleware("http")
+    async def limit_request_size(request: Request, call_next):
+        # Reject oversized uploads before the multipart body is parsed and spooled
+        length = request.headers.get("content-length")
+        if (
+            request.method == "POST"
+            and length
+            and length.isdigit()
+            and int(length) > settings.UPLOAD_MAX_REQUEST_BYTES + 64 * 1024
+        ):
+            return JSONResponse(status_code=413, content={"detail": "Request is too large"})
+        return await call_next(request)
+
     @app.exception_handler(RequestValidationError)
     async def validation_exception_handler(request: Request, exc: RequestValidationError):
         logger.error("Validation error: %s", exc.errors())
@@ -33,12 +67,19 @@ def create_app() -> FastAPI:
     app.include_router(cars.router)
     app.include_router(requests.router)
 
+    if settings.BOT_MODE == "webhook":
+        from api.routes import webhook
+
+        app.include_router(webhook.router)
+
     # Mount static files (built React app)
     STATIC_DIR.mkdir(parents=True, exist_ok=True)
-    app.mount("/static", StaticFiles(directory=str(STATIC_DIR), html=True), name="static")
+    app.mount(
+        "/static", PrecompressedStaticFiles(directory=str(STATIC_DIR), html=True), name="static"
+    )
 
     # Mount uploads
     UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
-    app.mount("/uploads", StaticFiles(directory=str(UPLOADS_DIR)), name="uploads")
+    app.mount("/uploads", UploadsStaticFiles(directory=str(UPLOADS_DIR)), name="uploads")
 
     return app
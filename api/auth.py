@@ -1,42 +1,130 @@
+import functools
 import hashlib
 import hmac
 import json
-from urllib.parse import parse_qs, unquote
+import logging
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl
 
+from fastapi import Header, HTTPException, Request
+from sqlalchemy import select
 
-def validate_init_data(init_data: str, bot_token: str) -> dict | None:
+from bot.config import settings
+from bot.db.engine import api_session
+from bot.db.models import User
+
+logger = logging.getLogger(__name__)
+
+# Tolerated clock difference for auth_date slightly in the future
+_CLOCK_SKEW = 60
+
+
+@functools.lru_cache(maxsize=4)
+def _secret_key(bot_token: str) -> bytes:
+    return hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+
+
+class _VerifiedCache:
+    """Bounded LRU of init_data hash -> (init_data, auth_date, user data).
+
+    A hit requires the whole init_data string to match, so a cached hash
+    can't be reused with altered fields; freshness is checked on every call.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: OrderedDict[str, tuple[str, int, dict]] = OrderedDict()
+
+    def get(self, received_hash: str, init_data: str) -> tuple[int, dict] | None:
+        item = self._items.get(received_hash)
+        if item is None or item[0] != init_data:
+            return None
+        self._items.move_to_end(received_hash)
+        return item[1], item[2]
+
+    def put(self, received_hash: str, init_data: str, auth_date: int, user_data: dict) -> None:
+        self._items[received_hash] = (init_data, auth_date, user_data)
+        self._items.move_to_end(received_hash)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+
+_verified = _VerifiedCache(settings.INIT_DATA_CACHE_SIZE)
+
+
+def _is_fresh(auth_date: int, max_age: int) -> bool:
+    age = time.time() - auth_date
+    return -_CLOCK_SKEW <= age <= max_age
+
+
+def validate_init_data(
+    init_data: str, bot_token: str, max_age: int | None = None
+) -> dict | None:
     """Validate Telegram Mini App init_data using HMAC-SHA256.
-    Returns parsed user data if valid, None otherwise.
+    Returns parsed user data if valid and issued within `max_age` seconds
+    (INIT_DATA_MAX_AGE_SECONDS by default), None otherwise.
     """
-    parsed = parse_qs(init_data)
+    if max_age is None:
+        max_age = settings.INIT_DATA_MAX_AGE_SECONDS
 
-    if "hash" not in parsed:
+    fields = dict(parse_qsl(init_data, keep_blank_values=True))
+    received_hash = fields.pop("hash", None)
+    if not received_hash:
         return None
 
-    received_hash = parsed.pop("hash")[0]
+    cached = _verified.get(received_hash, init_data)
+    if cached is not None:
+        auth_date, user_data = cached
+        return user_data if _is_fresh(auth_date, max_age) else None
 
     # Build data-check-string
-    data_check_pairs = []
-    for key in sorted(parsed.keys()):
-        data_check_pairs.append(f"{key}={unquote(parsed[key][0])}")
-    data_check_string = "\n".join(data_check_pairs)
-
-    # Compute secret key
-    secret_key = hmac.new(
-        b"WebAppData", bot_token.encode(), hashlib.sha256
-    ).digest()
-
-    # Compute hash
+    data_check_string = "\n".join(f"{key}={fields[key]}" for key in sorted(fields))
     computed_hash = hmac.new(
-        secret_key, data_check_string.encode(), hashlib.sha256
+        _secret_key(bot_token), data_check_string.encode(), hashlib.sha256
     ).hexdigest()
-
     if not hmac.compare_digest(computed_hash, received_hash):
         return None
 
-    # Extract user info
-    user_data = parsed.get("user")
-    if not user_data:
+    try:
+        auth_date = int(fields.get("auth_date", ""))
+        user_data = json.loads(fields["user"])
+    except (KeyError, ValueError):
+        return None
+    if not isinstance(user_data, dict):
         return None
 
-    return json.loads(unquote(user_data[0]))
+    _verified.put(received_hash, init_data, auth_date, user_data)
+    return user_data if _is_fresh(auth_date, max_age) else None
+
+
+async def get_current_user(
+    request: Request,
+    init_data: str = Header(default="", alias="X-Telegram-Init-Data"),
+) -> User:
+    """Dependency: the registered User behind the Mini App's init_data, taken
+    from the X-Telegram-Init-Data header or an `init_data` form field.
+    """
+    if not init_data and request.headers.get("content-type", "").startswith(
+        ("multipart/form-data", "application/x-www-form-urlencoded")
+    ):
+        # Already parsed for the route's own form fields; Starlette caches it
+        init_data = (await request.form()).get("init_data") or ""
+    if not init_data:
+        raise HTTPException(status_code=403, detail="Empty init_data")
+
+    user_data = validate_init_data(init_data, settings.BOT_TOKEN)
+    if user_data is None:
+        logger.warning("Invalid or expired init_data (len=%d)", len(init_data))
+        raise HTTPException(status_code=403, detail="Invalid init_data")
+
+    telegram_id = user_data.get("id")
+    if not telegram_id:
+        raise HTTPException(status_code=403, detail="No user id in init_data")
+
+    async with api_session() as session:
+        result = await session.execute(select(User).where(User.telegram_id == telegram_id))
+        user = result.scalar_one_or_none()
+    if user is None:
+        raise HTTPException(status_code=403, detail="User not found")
+    return user
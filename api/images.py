@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import os
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException
+from PIL import Image, ImageOps
+
+from api.uploads import StagedUpload
+from bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Refuse decompression bombs long before they reach memory limits. Pillow
+# itself only warns below 2x this, so normalize_image checks it explicitly.
+Image.MAX_IMAGE_PIXELS = 50_000_000
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def normalize_image(src: str, dest: str, thumb: str) -> tuple[int, int, int]:
+    """Runs in a worker process. Writes a downscaled JPEG to `dest` and a WebP
+    thumbnail to `thumb`, both without EXIF. Returns (width, height, bytes).
+    """
+    with Image.open(src) as img:
+        # Only the header has been read so far
+        width, height = img.size
+        if width * height > Image.MAX_IMAGE_PIXELS:
+            raise Image.DecompressionBombError(
+                f"Image size ({width}x{height}) exceeds limit of {Image.MAX_IMAGE_PIXELS} pixels"
+            )
+        img.draft("RGB", (settings.IMAGE_MAX_SIDE, settings.IMAGE_MAX_SIDE))
+        # Apply the camera rotation before the EXIF block is dropped
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        img.thumbnail((settings.IMAGE_MAX_SIDE, settings.IMAGE_MAX_SIDE), Image.LANCZOS)
+        img.save(
+            dest, "JPEG", quality=settings.IMAGE_QUALITY, optimize=True, progressive=True
+        )
+        width, height = img.size
+        img.thumbnail((settings.IMAGE_THUMB_SIDE, settings.IMAGE_THUMB_SIDE), Image.LANCZOS)
+        img.save(thumb, "WEBP", quality=settings.IMAGE_QUALITY)
+    return width, height, os.path.getsize(dest)
+
+
+class StagedPhoto:
+    """Normalized variants of one upload, waiting in INCOMING_DIR. When the
+    same bytes are already stored there are no files to move (main is None).
+    """
+
+    def __init__(
+        self,
+        sha256: str,
+        main: pathlib.Path | None,
+        thumb: pathlib.Path | None,
+        width: int = 0,
+        height: int = 0,
+        size: int = 0,
+    ):
+        self.sha256 = sha256
+        self.main = main
+        self.thumb = thumb
+        self.width = width
+        self.height = height
+        self.size = size
+
+    def commit(self, dest: pathlib.Path, thumb_dest: pathlib.Path) -> None:
+        if self.main is None:
+            return
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self.main, dest)
+        os.replace(self.thumb, thumb_dest)
+
+    def discard(self) -> None:
+        if self.main is not None:
+            self.main.unlink(missing_ok=True)
+            self.thumb.unlink(missing_ok=True)
+
+
+async def process_upload(upload: StagedUpload) -> StagedPhoto:
+    """Normalize a staged upload in the process pool; the original is removed."""
+    base = upload.temp_path.with_suffix("")
+    photo = StagedPhoto(
+        upload.sha256, base.with_suffix(".jpg"), base.with_name(base.name + "_thumb.webp")
+    )
+    loop = asyncio.get_running_loop()
+    try:
+        photo.width, photo.height, photo.size = await loop.run_in_executor(
+            _get_pool(),
+            normalize_image,
+            str(upload.temp_path),
+            str(photo.main),
+            str(photo.thumb),
+        )
+    except Exception as e:
+        photo.discard()
+        logger.warning("Could not process photo: %s", e)
+        raise HTTPException(status_code=415, detail="Could not read photo")
+    finally:
+        upload.discard()
+    return photo
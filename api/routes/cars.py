@@ -1,22 +1,48 @@
-import json
-import pathlib
+from fastapi import APIRouter, Header, Response
 
-from fastapi import APIRouter
+from api.static import accepted_encodings
+from bot.services.catalog import cars_catalog
 
 router = APIRouter()
 
-_CARS_PATH = pathlib.Path(__file__).resolve().parent.parent.parent / "data" / "cars.json"
-_cars_data: dict | None = None
+_CACHE_CONTROL = "public, max-age=300"
 
 
-def _load_cars() -> dict:
-    global _cars_data
-    if _cars_data is None:
-        with open(_CARS_PATH) as f:
-            _cars_data = json.load(f)
-    return _cars_data
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Compressed variants carry a suffix; they all describe the same catalog
+    base = etag.strip('"')
+    return any(
+        tag.strip().removeprefix("W/").strip('"').split("-")[0] == base
+        for tag in if_none_match.split(",")
+    )
 
 
 @router.get("/api/cars")
-async def get_cars():
-    return _load_cars()
+async def get_cars(
+    accept_encoding: str = Header(default=""),
+    if_none_match: str = Header(default=""),
+):
+    snapshot = cars_catalog.snapshot()
+
+    encodings = accepted_encodings(accept_encoding)
+    if snapshot.br is not None and "br" in encodings:
+        body, encoding = snapshot.br, "br"
+    elif "gzip" in encodings:
+        body, encoding = snapshot.gzip, "gzip"
+    else:
+        body, encoding = snapshot.body, None
+
+    headers = {
+        "Cache-Control": _CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+        # Strong ETags differ per representation
+        "ETag": snapshot.etag[:-1] + f'-{encoding}"' if encoding else snapshot.etag,
+    }
+    if if_none_match and _etag_matches(if_none_match, snapshot.etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,12 +1,12 @@
 import logging
-import pathlib
 
-import aiofiles
-from fastapi import APIRouter, File, Form, HTTPException, Request as FastAPIRequest, UploadFile
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Response, UploadFile
 
-from api.auth import validate_init_data
+from api.auth import get_current_user
+from api.images import StagedPhoto, process_upload
+from api.uploads import UPLOADS_DIR, StagedUpload, blob_paths, stage_upload
 from bot.config import settings
-from bot.db.engine import async_session
+from bot.db.engine import api_session
 from bot.db.models import (
     PartTypeEnum,
     Request,
@@ -15,41 +15,36 @@ from bot.db.models import (
     RoleEnum,
     User,
 )
+from bot.services.idempotency_service import claim_key, find_replay
+from bot.services.outbox import enqueue_fan_out, get_fan_out_status
+from bot.services.photo_service import add_blob_ref, get_blobs
 
 from sqlalchemy import select
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-UPLOADS_DIR = pathlib.Path(__file__).resolve().parent.parent.parent / "uploads"
-
 
 @router.post("/api/requests")
 async def create_request(
+    response: Response,
     brand: str = Form(...),
     model: str = Form(...),
     year: int = Form(...),
     description: str = Form(...),
     part_type: str = Form(...),
-    init_data: str = Form(default=""),
     photos: list[UploadFile] | None = File(default=None),
+    idempotency_key: str = Form(default=""),
+    idempotency_key_header: str = Header(default="", alias="Idempotency-Key"),
+    user: User = Depends(get_current_user),
 ):
     photos = photos or []
-    logger.info("Received request: brand=%s model=%s year=%s part_type=%s init_data_len=%d photos=%d",
-                brand, model, year, part_type, len(init_data), len(photos))
-
-    # Validate init_data
-    if not init_data:
-        raise HTTPException(status_code=403, detail="Empty init_data")
-
-    user_data = validate_init_data(init_data, settings.BOT_TOKEN)
-    if user_data is None:
-        logger.error("Invalid init_data (len=%d): %s", len(init_data), init_data[:200])
-        raise HTTPException(status_code=403, detail="Invalid init_data")
+    logger.info("Received request: brand=%s model=%s year=%s part_type=%s photos=%d",
+                brand, model, year, part_type, len(photos))
 
-    telegram_id = user_data.get("id")
-    if not telegram_id:
-        raise HTTPException(status_code=403, detail="No user id in init_data")
+    # Checked before any photo is processed
+    if user.role != RoleEnum.client:
+        raise HTTPException(status_code=403, detail="Not a client")
 
     # Validate part_type
     try:
@@ -57,56 +52,134 @@ async def create_request(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid part_type")
 
-    async with async_session() as session:
-        # Check user exists and is client
-        result = await session.execute(
-            select(User).where(User.telegram_id == telegram_id)
+    # A retried or double-tapped submission gets the original request back
+    key = idempotency_key_header or idempotency_key or None
+    if key is not None:
+        if len(key) > 64:
+            raise HTTPException(status_code=400, detail="Idempotency key is too long")
+        async with api_session() as session:
+            request_id = await find_replay(session, user.id, key)
+        if request_id is not None:
+            response.headers["Idempotent-Replayed"] = "true"
+            return {"ok": True, "request_id": request_id}
+
+    # Stream, hash and normalize photos before any DB transaction is opened
+    uploads: list[StagedUpload] = []
+    staged: list[StagedPhoto] = []
+    try:
+        budget = settings.UPLOAD_MAX_REQUEST_BYTES
+        for photo in photos[: settings.UPLOAD_MAX_PHOTOS]:
+            if not photo.filename:
+                continue
+            upload = await stage_upload(photo, budget)
+            uploads.append(upload)
+            budget -= upload.size
+
+        known = {}
+        if uploads:
+            async with api_session() as session:
+                known = await get_blobs(session, [upload.sha256 for upload in uploads])
+        for upload in uploads:
+            blob = known.get(upload.sha256)
+            if blob and (UPLOADS_DIR / blob.file_path).exists():
+                # Same bytes already stored: nothing to process or write. The
+                # upload is kept in case the blob is purged before we commit.
+                staged.append(
+                    StagedPhoto(
+                        upload.sha256, None, None, blob.width, blob.height, blob.size_bytes
+                    )
+                )
+            else:
+                staged.append(await process_upload(upload))
+
+        request_id, created = await _save_request(
+            user.id, brand, model, year, description, pt, staged, key
         )
-        user = result.scalar_one_or_none()
-        if not user or user.role != RoleEnum.client:
-            raise HTTPException(status_code=403, detail="User not found or not a client")
+        if not created:
+            response.headers["Idempotent-Replayed"] = "true"
+
+        # Files become visible only once the rows referencing them are committed
+        for i, photo in enumerate(staged if created else ()):
+            file_path, thumb_path = blob_paths(photo.sha256)
+            if photo.main is None and not (UPLOADS_DIR / file_path).exists():
+                # Purged as unreferenced while this request was being saved
+                photo = staged[i] = await process_upload(uploads[i])
+            photo.commit(UPLOADS_DIR / file_path, UPLOADS_DIR / thumb_path)
+    finally:
+        for upload in uploads:
+            upload.discard()
+        for photo in staged:
+            photo.discard()
+
+    return {"ok": True, "request_id": request_id}
+
 
+async def _save_request(
+    client_id: int,
+    brand: str,
+    model: str,
+    year: int,
+    description: str,
+    part_type: PartTypeEnum,
+    staged: list[StagedPhoto],
+    idempotency_key: str | None,
+) -> tuple[int, bool]:
+    """Returns (request_id, created); created is False when a concurrent
+    submission with the same idempotency key won and nothing was written.
+    """
+    async with api_session() as session:
         # Create request
         req = Request(
-            client_id=user.id,
+            client_id=client_id,
             brand=brand,
             model=model,
             year=year,
             description=description,
-            part_type=pt,
+            part_type=part_type,
             status=RequestStatusEnum.active,
         )
         session.add(req)
         await session.flush()
 
-        # Save photos (up to 3)
-        photo_files = photos[:3]
-        req_dir = UPLOADS_DIR / str(req.id)
-        if photo_files:
-            req_dir.mkdir(parents=True, exist_ok=True)
-
-        for i, photo in enumerate(photo_files):
-            if not photo.filename:
-                continue
-            ext = pathlib.Path(photo.filename).suffix or ".jpg"
-            file_name = f"{i + 1}{ext}"
-            file_path = req_dir / file_name
-
-            async with aiofiles.open(file_path, "wb") as f:
-                content = await photo.read()
-                await f.write(content)
-
-            rp = RequestPhoto(
-                request_id=req.id, file_path=str(file_path.relative_to(UPLOADS_DIR))
+        if idempotency_key is not None:
+            existing = await claim_key(session, client_id, idempotency_key, req.id)
+            if existing is not None:
+                await session.rollback()
+                return existing, False
+
+        # Blob paths come from the content hash; new files are moved there after commit
+        for photo in staged:
+            file_path, thumb_path = blob_paths(photo.sha256)
+            await add_blob_ref(
+                session,
+                photo.sha256,
+                file_path,
+                thumb_path,
+                photo.width,
+                photo.height,
+                photo.size,
+            )
+            session.add(
+                RequestPhoto(
+                    request_id=req.id, file_path=file_path, blob_sha256=photo.sha256
+                )
             )
-            session.add(rp)
 
+        # Seller fan-out runs in the outbox workers, not on the response path
+        enqueue_fan_out(session, req.id)
         await session.commit()
-        request_id = req.id
+        return req.id, True
 
-    # Notify sellers (import here to avoid circular imports at module level)
-    from bot.services.notification import notify_sellers
 
-    await notify_sellers(request_id)
+@router.get("/api/requests/{request_id}/status")
+async def get_request_status(request_id: int, user: User = Depends(get_current_user)):
+    async with api_session() as session:
+        result = await session.execute(
+            select(Request.id).where(Request.id == request_id, Request.client_id == user.id)
+        )
+        if result.scalar_one_or_none() is None:
+            raise HTTPException(status_code=404, detail="Request not found")
 
-    return {"ok": True, "request_id": request_id}
+        status = await get_fan_out_status(session, request_id)
+
+    return {"request_id": request_id, **status}
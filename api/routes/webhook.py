@@ -0,0 +1,28 @@
+import asyncio
+import hmac
+
+from aiogram.types import Update
+from fastapi import APIRouter, Header, HTTPException, Request
+
+from bot.config import settings
+from bot.loader import bot
+from bot.webhook import update_queue
+
+router = APIRouter()
+
+
+@router.post(settings.WEBHOOK_PATH, include_in_schema=False)
+async def telegram_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: str = Header(default=""),
+):
+    if not hmac.compare_digest(x_telegram_bot_api_secret_token, settings.WEBHOOK_SECRET):
+        raise HTTPException(status_code=401, detail="Invalid secret token")
+
+    update = Update.model_validate(await request.json(), context={"bot": bot})
+    try:
+        update_queue.put_nowait(update)
+    except asyncio.QueueFull:
+        # Telegram retries non-2xx responses, so the update is not lost
+        raise HTTPException(status_code=503, detail="Update queue is full")
+    return {"ok": True}
@@ -0,0 +1,107 @@
+import mimetypes
+import os
+import re
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+# Vite output names: assets/<name>-<content hash>.<ext>
+_FINGERPRINTED = re.compile(r"(^|/)assets/[^/]+-[A-Za-z0-9_-]{8,}\.\w+$")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Preferred first
+_PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """Content codings the client accepts; `q=0` explicitly refuses one."""
+    accepted = set()
+    for item in header.lower().split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding)
+    return accepted
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with per-file Cache-Control. FileResponse already handles
+    Range/If-Range, and file_response() answers If-None-Match and
+    If-Modified-Since with 304. Dot-prefixed paths are never served.
+    """
+
+    def cache_control(self, path: str) -> str:
+        return REVALIDATE
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        # "." is the mount root itself
+        if any(part.startswith(".") and part != "." for part in path.split(os.sep)):
+            raise HTTPException(status_code=404)
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 206, 304):
+            response.headers["Cache-Control"] = self.cache_control(path)
+        return response
+
+
+class PrecompressedStaticFiles(CachedStaticFiles):
+    """Serves the .br / .gz sibling written at build time when the client
+    accepts it. Fingerprinted Vite assets are cached forever; everything else
+    (index.html) is revalidated on each open.
+    """
+
+    def cache_control(self, path: str) -> str:
+        return IMMUTABLE if _FINGERPRINTED.search(path) else REVALIDATE
+
+    def file_response(
+        self,
+        full_path: str | os.PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+
+        response = None
+        for encoding, suffix in _PRECOMPRESSED:
+            if encoding not in accepted:
+                continue
+            try:
+                compressed_stat = os.stat(f"{full_path}{suffix}")
+            except OSError:
+                continue
+            response = FileResponse(
+                f"{full_path}{suffix}",
+                status_code=status_code,
+                stat_result=compressed_stat,
+                media_type=media_type,
+                headers={"Content-Encoding": encoding},
+            )
+            break
+        if response is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        response.headers["Vary"] = "Accept-Encoding"
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+class UploadsStaticFiles(CachedStaticFiles):
+    """Blob paths are content addressed, so they never change."""
+
+    def cache_control(self, path: str) -> str:
+        return IMMUTABLE if path.startswith("blobs/") else "public, max-age=86400"
@@ -0,0 +1,81 @@
+import hashlib
+import logging
+import pathlib
+import uuid
+
+import aiofiles
+from fastapi import HTTPException, UploadFile
+
+from bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+UPLOADS_DIR = pathlib.Path(__file__).resolve().parent.parent / "uploads"
+# Same filesystem as UPLOADS_DIR, so moving a finished photo is a rename
+INCOMING_DIR = UPLOADS_DIR / ".incoming"
+
+# Leading bytes of the image formats Telegram accepts as photos
+_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+)
+
+
+def sniff_extension(head: bytes) -> str | None:
+    for signature, ext in _SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+class StagedUpload:
+    """A raw upload written to INCOMING_DIR, waiting to be processed."""
+
+    def __init__(self, temp_path: pathlib.Path, ext: str):
+        self.temp_path = temp_path
+        self.ext = ext
+        self.size = 0
+        self.sha256 = ""
+
+    def discard(self) -> None:
+        self.temp_path.unlink(missing_ok=True)
+
+
+async def stage_upload(upload: UploadFile, budget: int) -> StagedUpload:
+    """Copy an upload to a temp file in fixed-size chunks. Rejects files over
+    UPLOAD_MAX_FILE_BYTES or the request's remaining `budget`, and anything
+    that isn't a JPEG, PNG or WebP image.
+    """
+    limit = min(settings.UPLOAD_MAX_FILE_BYTES, budget)
+    chunk = await upload.read(settings.UPLOAD_CHUNK_SIZE)
+    ext = sniff_extension(chunk)
+    if ext is None:
+        raise HTTPException(status_code=415, detail="Photos must be JPEG, PNG or WebP")
+
+    INCOMING_DIR.mkdir(parents=True, exist_ok=True)
+    staged = StagedUpload(INCOMING_DIR / f"{uuid.uuid4().hex}.part", ext)
+    digest = hashlib.sha256()
+    try:
+        async with aiofiles.open(staged.temp_path, "wb") as f:
+            while chunk:
+                staged.size += len(chunk)
+                if staged.size > limit:
+                    raise HTTPException(status_code=413, detail="Photo is too large")
+                digest.update(chunk)
+                await f.write(chunk)
+                chunk = await upload.read(settings.UPLOAD_CHUNK_SIZE)
+    except BaseException:
+        staged.discard()
+        raise
+    staged.sha256 = digest.hexdigest()
+    return staged
+
+
+def blob_paths(sha256: str) -> tuple[str, str]:
+    """Paths (relative to UPLOADS_DIR) of a blob's photo and thumbnail,
+    sharded two levels deep so no directory grows too large.
+    """
+    base = f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+    return f"{base}.jpg", f"{base}_thumb.webp"
@@ -6,6 +6,89 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     WEBAPP_URL: str
 
+    # HTTP API (api role runs API_WORKERS uvicorn processes)
+    API_HOST: str = "0.0.0.0"
+    API_PORT: int = 8000
+    API_WORKERS: int = 1
+
+    # Photo uploads from the Mini App
+    UPLOAD_MAX_PHOTOS: int = 3
+    UPLOAD_MAX_FILE_BYTES: int = 10 * 1024 * 1024
+    UPLOAD_MAX_REQUEST_BYTES: int = 25 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 64 * 1024
+    # Stored photos are re-encoded to at most this size, in IMAGE_WORKERS processes
+    IMAGE_MAX_SIDE: int = 1600
+    IMAGE_THUMB_SIDE: int = 320
+    IMAGE_QUALITY: int = 82
+    IMAGE_WORKERS: int = 2
+    # Mini App init_data older than this is rejected; verified hashes are cached
+    INIT_DATA_MAX_AGE_SECONDS: int = 86400
+    INIT_DATA_CACHE_SIZE: int = 4096
+    # Replays of a submission's Idempotency-Key return the original request
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+
+    # Update ingest: "polling", or "webhook" served by the FastAPI app
+    BOT_MODE: str = "polling"
+    # Public base URL Telegram posts updates to, e.g. https://your-domain.com
+    WEBHOOK_URL: str = ""
+    WEBHOOK_PATH: str = "/telegram/webhook"
+    WEBHOOK_SECRET: str = ""
+    WEBHOOK_QUEUE_SIZE: int = 1000
+    WEBHOOK_WORKERS: int = 8
+
+    # Database connection pools: bot handlers, API and background jobs
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 5
+    DB_API_POOL_SIZE: int = 5
+    DB_API_MAX_OVERFLOW: int = 5
+    DB_BACKGROUND_POOL_SIZE: int = 3
+    DB_BACKGROUND_MAX_OVERFLOW: int = 2
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 500
+    DB_POOL_STATS_INTERVAL: int = 300
+
+    # Telegram send limits (messages per second)
+    TG_GLOBAL_RATE: float = 30.0
+    TG_CHAT_RATE: float = 1.0
+    TG_CHAT_BURST: float = 3.0
+    # Processes running outbox workers; each sends at 1/N of the rates above
+    OUTBOX_PROCESSES: int = 1
+    TG_MAX_RETRY_AFTER_ATTEMPTS: int = 3
+    FANOUT_CONCURRENCY: int = 16
+
+    # Outbox workers
+    OUTBOX_WORKERS: int = 2
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_POLL_INTERVAL: float = 1.0
+    OUTBOX_LEASE_SECONDS: int = 120
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_RETRY_BASE: float = 5.0
+    OUTBOX_RETRY_MAX: float = 3600.0
+    OUTBOX_KEEP_SENT_DAYS: int = 7
+
+    # FSM storage: "memory" (single process), "redis" or "postgres"
+    FSM_STORAGE: str = "memory"
+    REDIS_URL: str = "redis://localhost:6379/0"
+    # Abandoned conversations expire after this long (redis/postgres only)
+    FSM_TTL_SECONDS: int = 86400
+
+    SELLER_INDEX_RECONCILE_SECONDS: int = 300
+
+    # Cached telegram_id -> (user id, role, language) lookups. Changes are
+    # broadcast over Postgres NOTIFY; the TTL only matters if one is missed.
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL_SECONDS: float = 300.0
+
+    # Request expiry: wake at the next deadline, but at least this often
+    EXPIRY_MAX_SLEEP_SECONDS: int = 3600
+    EXPIRY_CHUNK_SIZE: int = 1000
+
+    # Offers arriving within this window are merged into one client card update
+    OFFER_CARD_WINDOW_SECONDS: float = 10.0
+    OFFER_CARD_MAX_OFFERS: int = 10
+
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
 
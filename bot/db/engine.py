@@ -1,6 +1,53 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 
 from bot.config import settings
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False)
+
+def _create_engine(pool_size: int, max_overflow: int) -> AsyncEngine:
+    url = make_url(settings.DATABASE_URL)
+    if url.get_backend_name() != "postgresql":
+        # SQLite (tests, local runs) uses its own pool classes without these knobs
+        return create_async_engine(url, echo=False)
+
+    connect_args = {}
+    if url.drivername == "postgresql+asyncpg":
+        connect_args["prepared_statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+    return create_async_engine(
+        url,
+        echo=False,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+
+# Separate pools so API uploads and background jobs can't starve bot handlers
+engine = _create_engine(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+api_engine = _create_engine(settings.DB_API_POOL_SIZE, settings.DB_API_MAX_OVERFLOW)
+background_engine = _create_engine(
+    settings.DB_BACKGROUND_POOL_SIZE, settings.DB_BACKGROUND_MAX_OVERFLOW
+)
+
 async_session = async_sessionmaker(engine, expire_on_commit=False)
+api_session = async_sessionmaker(api_engine, expire_on_commit=False)
+background_session = async_sessionmaker(background_engine, expire_on_commit=False)
+
+
+def pool_stats() -> dict[str, dict]:
+    stats = {}
+    for name, eng in (("bot", engine), ("api", api_engine), ("background", background_engine)):
+        pool = eng.pool
+        if not isinstance(pool, QueuePool):
+            continue  # SQLite's static/null pools have no size to report
+        stats[name] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+        }
+    return stats
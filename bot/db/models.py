@@ -6,10 +6,13 @@ from sqlalchemy import (
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
+    JSON,
     String,
     Text,
     UniqueConstraint,
+    text,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
@@ -51,6 +54,12 @@ class AvailabilityEnum(str, enum.Enum):
     order_3_7 = "order_3_7"
 
 
+class OutboxStatusEnum(str, enum.Enum):
+    pending = "pending"
+    sent = "sent"
+    failed = "failed"
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -76,7 +85,10 @@ class User(Base):
 
 class SellerBrand(Base):
     __tablename__ = "seller_brands"
-    __table_args__ = (UniqueConstraint("seller_id", "brand"),)
+    __table_args__ = (
+        UniqueConstraint("seller_id", "brand"),
+        Index("ix_seller_brands_brand", "brand"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     seller_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
@@ -87,6 +99,16 @@ class SellerBrand(Base):
 
 class Request(Base):
     __tablename__ = "requests"
+    # status leads instead of a partial WHERE status = 'active': queries bind
+    # status as a parameter, which generic prepared plans can't match to a predicate
+    __table_args__ = (
+        # expire_old_requests / next expiry lookup
+        Index("ix_requests_status_expires_at", "status", "expires_at"),
+        # Seller inbox: brand IN (...) ORDER BY created_at DESC, id DESC
+        Index("ix_requests_status_brand_created", "status", "brand", "created_at", "id"),
+        # Client's "my requests" list
+        Index("ix_requests_client_status_created", "client_id", "status", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     client_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
@@ -104,6 +126,8 @@ class Request(Base):
     expires_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc) + timedelta(hours=48)
     )
+    # Client's live offers summary message, edited in place as offers arrive
+    offer_card_message_id: Mapped[int | None] = mapped_column(BigInteger)
 
     client: Mapped["User"] = relationship(back_populates="requests")
     photos: Mapped[list["RequestPhoto"]] = relationship(
@@ -114,23 +138,55 @@ class Request(Base):
     )
 
 
+class PhotoBlob(Base):
+    """A stored photo, addressed by the SHA-256 of the uploaded bytes.
+    Identical uploads share one blob; ref_count tracks the RequestPhoto rows
+    pointing at it (add_blob_ref / release_blob_ref), and blobs left at zero
+    are purged with their files.
+    """
+
+    __tablename__ = "photo_blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    # Normalized JPEG (downscaled, no EXIF); this is what sellers receive
+    file_path: Mapped[str] = mapped_column(String, nullable=False)
+    thumb_path: Mapped[str] = mapped_column(String, nullable=False)
+    width: Mapped[int] = mapped_column(Integer, nullable=False)
+    height: Mapped[int] = mapped_column(Integer, nullable=False)
+    size_bytes: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Telegram file_id from the first successful upload, reused for later sends
+    telegram_file_id: Mapped[str | None] = mapped_column(String)
+    ref_count: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+
 class RequestPhoto(Base):
     __tablename__ = "request_photos"
 
     id: Mapped[int] = mapped_column(primary_key=True)
     request_id: Mapped[int] = mapped_column(
-        ForeignKey("requests.id", ondelete="CASCADE")
+        ForeignKey("requests.id", ondelete="CASCADE"), index=True
     )
+    # Same as blob.file_path; rows from before the blob store have no blob
     file_path: Mapped[str] = mapped_column(String, nullable=False)
+    blob_sha256: Mapped[str | None] = mapped_column(
+        ForeignKey("photo_blobs.sha256"), index=True
+    )
+    # Only used for rows without a blob
+    telegram_file_id: Mapped[str | None] = mapped_column(String)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
     )
 
     request: Mapped["Request"] = relationship(back_populates="photos")
+    blob: Mapped["PhotoBlob | None"] = relationship()
 
 
 class Offer(Base):
     __tablename__ = "offers"
+    # Also serves offer lookups and counts by request_id (leading column)
     __table_args__ = (UniqueConstraint("request_id", "seller_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -148,3 +204,71 @@ class Offer(Base):
 
     request: Mapped["Request"] = relationship(back_populates="offers")
     seller: Mapped["User"] = relationship(back_populates="offers")
+
+
+class OutboxMessage(Base):
+    """Outbound Telegram message waiting to be delivered by the outbox workers."""
+
+    __tablename__ = "outbox"
+    __table_args__ = (
+        # At most one not-yet-claimed offer card update per request
+        Index(
+            "uq_outbox_pending_offer_card",
+            "request_id",
+            unique=True,
+            postgresql_where=text(
+                "method = 'offer_card' AND status = 'pending' AND attempts = 0"
+            ),
+        ),
+        # Worker claim query
+        Index("ix_outbox_status_due", "status", "next_attempt_at", "id"),
+        Index("ix_outbox_request_id", "request_id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # Empty for jobs that only produce other messages (e.g. "notify_sellers")
+    chat_id: Mapped[int | None] = mapped_column(BigInteger)
+    # Set on seller notifications so fan-out progress can be tracked per request
+    request_id: Mapped[int | None] = mapped_column(
+        ForeignKey("requests.id", ondelete="CASCADE")
+    )
+    method: Mapped[str] = mapped_column(String, nullable=False)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+    status: Mapped[OutboxStatusEnum] = mapped_column(
+        Enum(OutboxStatusEnum), default=OutboxStatusEnum.pending
+    )
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+    last_error: Mapped[str | None] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+
+class FsmRecord(Base):
+    """Conversation state for the Postgres FSM storage (FSM_STORAGE=postgres)."""
+
+    __tablename__ = "fsm_states"
+
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    state: Mapped[str | None] = mapped_column(String)
+    data: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+
+
+class IdempotencyKey(Base):
+    """Client-supplied key of a Mini App submission; a replay returns request_id."""
+
+    __tablename__ = "idempotency_keys"
+
+    client_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    request_id: Mapped[int] = mapped_column(
+        ForeignKey("requests.id", ondelete="CASCADE"), nullable=False
+    )
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
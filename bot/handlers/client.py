@@ -1,59 +1,54 @@
 from aiogram import F, Router
-from aiogram.types import CallbackQuery, Message
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message
 
-from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.db.engine import async_session
-from bot.db.models import RoleEnum, User
 from bot.keyboards.inline import (
     my_requests_keyboard,
     request_detail_keyboard,
     webapp_keyboard,
 )
 from bot.locales import t
-from bot.services._helpers import format_offers_count, time_ago
+from bot.services._helpers import (
+    OFFER_COMMENT_PREVIEW,
+    format_offers_count,
+    time_ago,
+    truncate,
+)
 from bot.services.offer_service import get_offer_with_seller
 from bot.services.request_service import close_request, get_request_detail, get_user_requests
+from bot.services.user_cache import UserProfile
 
 router = Router()
 
 
-async def _get_user_lang(telegram_id: int) -> tuple[User | None, str]:
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == telegram_id)
-        )
-        user = result.scalar_one_or_none()
-        lang = user.language.value if user and user.language else "ru"
-        return user, lang
-
-
 # --- "Найти запчасть" → отправляем inline-кнопку с WebApp ---
 @router.message(F.text.in_(["🔍 Найти запчасть", "🔍 Ehtiyot qism topish"]))
-async def on_find_part(message: Message):
-    _, lang = await _get_user_lang(message.from_user.id)
+async def on_find_part(message: Message, lang: str):
     await message.answer(
         t("find_part", lang), reply_markup=webapp_keyboard(lang)
     )
 
 
 # --- "Мои запросы" ---
-@router.message(F.text.in_(["📋 Мои запросы", "📋 Mening so'rovlarim"]))
-async def on_my_requests(message: Message):
-    user, lang = await _get_user_lang(message.from_user.id)
-    if not user:
-        return
-
-    async with async_session() as session:
-        requests = await get_user_requests(session, user.id)
-
-    if not requests:
-        await message.answer(t("no_requests", lang))
-        return
+async def _my_requests_page(
+    session: AsyncSession,
+    user: UserProfile,
+    lang: str,
+    cursor: str | None = None,
+    direction: str = "next",
+) -> tuple[str, InlineKeyboardMarkup | None]:
+    page = await get_user_requests(session, user.id, cursor, direction)
+    if not page["items"] and cursor:
+        # Everything past the cursor was closed meanwhile; start from the top
+        page = await get_user_requests(session, user.id)
+    if not page["items"]:
+        return t("no_requests", lang), None
 
     lines = [t("my_requests_list", lang), ""]
     req_list = []
-    for i, req in enumerate(requests, 1):
+    for i, req in enumerate(page["items"], 1):
         offers_text = format_offers_count(req["offer_count"], lang)
         ago = time_ago(req["created_at"], lang)
         lines.append(
@@ -64,25 +59,52 @@ async def on_my_requests(message: Message):
                 brand=req["brand"],
                 model=req["model"],
                 year=req["year"],
-                description=req["description"],
+                description=truncate(req["description"]),
                 offers_text=offers_text,
                 time_ago=ago,
             )
         )
         req_list.append((req["id"], i))
 
-    keyboard = my_requests_keyboard(req_list, lang)
-    await message.answer("\n".join(lines), reply_markup=keyboard)
+    keyboard = my_requests_keyboard(req_list, lang, page["prev"], page["next"])
+    return "\n".join(lines), keyboard
+
+
+@router.message(F.text.in_(["📋 Мои запросы", "📋 Mening so'rovlarim"]))
+async def on_my_requests(
+    message: Message, session: AsyncSession, user: UserProfile | None, lang: str
+):
+    if not user:
+        return
+
+    text, keyboard = await _my_requests_page(session, user, lang)
+    await message.answer(text, reply_markup=keyboard)
+
+
+@router.callback_query(F.data.startswith("my_requests:"))
+async def on_my_requests_page(
+    callback: CallbackQuery, session: AsyncSession, user: UserProfile | None, lang: str
+):
+    if not user:
+        await callback.answer()
+        return
+
+    _, direction, cursor = callback.data.split(":")
+    text, keyboard = await _my_requests_page(session, user, lang, cursor, direction)
+    try:
+        await callback.message.edit_text(text, reply_markup=keyboard)
+    except TelegramBadRequest as e:
+        # A double tap renders the same page twice
+        if "message is not modified" not in str(e):
+            raise
+    await callback.answer()
 
 
 # --- Request detail ---
 @router.callback_query(F.data.startswith("request_detail:"))
-async def on_request_detail(callback: CallbackQuery):
+async def on_request_detail(callback: CallbackQuery, session: AsyncSession, lang: str):
     request_id = int(callback.data.split(":")[1])
-    _, lang = await _get_user_lang(callback.from_user.id)
-
-    async with async_session() as session:
-        detail = await get_request_detail(session, request_id)
+    detail = await get_request_detail(session, request_id)
 
     if not detail:
         await callback.answer()
@@ -122,6 +144,9 @@ async def on_request_detail(callback: CallbackQuery):
                     availability=avail_label,
                 )
             )
+            if offer["comment"]:
+                comment = truncate(offer["comment"], OFFER_COMMENT_PREVIEW)
+                lines.append(t("offer_comment_line", lang, comment=comment))
             offer_btns.append((offer["id"], offer["seller_name"]))
 
         keyboard = request_detail_keyboard(offer_btns, request_id, lang)
@@ -146,12 +171,9 @@ async def on_request_detail(callback: CallbackQuery):
 
 # --- Contact seller ---
 @router.callback_query(F.data.startswith("contact:"))
-async def on_contact_seller(callback: CallbackQuery):
+async def on_contact_seller(callback: CallbackQuery, session: AsyncSession, lang: str):
     offer_id = int(callback.data.split(":")[1])
-    _, lang = await _get_user_lang(callback.from_user.id)
-
-    async with async_session() as session:
-        offer_data = await get_offer_with_seller(session, offer_id)
+    offer_data = await get_offer_with_seller(session, offer_id)
 
     if not offer_data:
         await callback.answer()
@@ -178,12 +200,9 @@ async def on_contact_seller(callback: CallbackQuery):
 
 # --- Close request ---
 @router.callback_query(F.data.startswith("close_request:"))
-async def on_close_request(callback: CallbackQuery):
+async def on_close_request(callback: CallbackQuery, session: AsyncSession, lang: str):
     request_id = int(callback.data.split(":")[1])
-    _, lang = await _get_user_lang(callback.from_user.id)
-
-    async with async_session() as session:
-        closed = await close_request(session, request_id)
+    closed = await close_request(session, request_id)
 
     if closed:
         await callback.message.edit_text(
@@ -1,72 +1,54 @@
 from aiogram import F, Router
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message
 
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.db.engine import async_session
 from bot.db.models import (
     AvailabilityEnum,
     CurrencyEnum,
-    Offer,
     Request,
-    RequestStatusEnum,
-    SellerBrand,
     User,
 )
 from bot.keyboards.inline import (
     availability_keyboard,
-    contact_seller_keyboard,
     currency_keyboard,
     seller_active_requests_keyboard,
     skip_comment_keyboard,
 )
 from bot.locales import t
-from bot.services.offer_service import create_offer
+from bot.services._helpers import time_ago, truncate
+from bot.services.offer_service import check_can_offer, create_offer
+from bot.services.outbox import enqueue_message, enqueue_offer_card
+from bot.services.request_service import get_seller_requests
+from bot.services.seller_index import seller_index
+from bot.services.user_cache import UserProfile
 from bot.states import SellerResponseState
 
 router = Router()
 
 
-async def _get_user_lang(telegram_id: int) -> tuple[User | None, str]:
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == telegram_id)
-        )
-        user = result.scalar_one_or_none()
-        lang = user.language.value if user and user.language else "ru"
-        return user, lang
-
-
 # --- "Ответить ценой" ---
 @router.callback_query(F.data.startswith("respond:"))
-async def on_respond_price(callback: CallbackQuery, state: FSMContext):
+async def on_respond_price(
+    callback: CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+    user: UserProfile | None,
+    lang: str,
+):
     request_id = int(callback.data.split(":")[1])
-    user, lang = await _get_user_lang(callback.from_user.id)
     if not user:
         await callback.answer()
         return
 
-    async with async_session() as session:
-        # Check request is active
-        result = await session.execute(
-            select(Request).where(Request.id == request_id)
-        )
-        req = result.scalar_one_or_none()
-        if not req or req.status != RequestStatusEnum.active:
-            await callback.answer(t("request_not_active", lang), show_alert=True)
-            return
-
-        # Check not already responded
-        result = await session.execute(
-            select(Offer).where(
-                Offer.request_id == request_id, Offer.seller_id == user.id
-            )
-        )
-        if result.scalar_one_or_none():
-            await callback.answer(t("already_responded", lang), show_alert=True)
-            return
+    # Check request is active and not already responded
+    error = await check_can_offer(session, request_id, user.id)
+    if error:
+        await callback.answer(t(error, lang), show_alert=True)
+        return
 
     await state.set_state(SellerResponseState.waiting_price)
     await state.update_data(request_id=request_id)
@@ -75,9 +57,7 @@ async def on_respond_price(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(SellerResponseState.waiting_price)
-async def on_price_entered(message: Message, state: FSMContext):
-    _, lang = await _get_user_lang(message.from_user.id)
-
+async def on_price_entered(message: Message, state: FSMContext, lang: str):
     text = message.text.strip() if message.text else ""
     if not text.isdigit() or int(text) <= 0:
         await message.answer(t("invalid_price", lang))
@@ -91,9 +71,8 @@ async def on_price_entered(message: Message, state: FSMContext):
 @router.callback_query(
     SellerResponseState.waiting_currency, F.data.startswith("currency:")
 )
-async def on_currency_chosen(callback: CallbackQuery, state: FSMContext):
+async def on_currency_chosen(callback: CallbackQuery, state: FSMContext, lang: str):
     currency = callback.data.split(":")[1]
-    _, lang = await _get_user_lang(callback.from_user.id)
 
     await state.update_data(currency=currency)
     await state.set_state(SellerResponseState.waiting_availability)
@@ -106,9 +85,8 @@ async def on_currency_chosen(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(
     SellerResponseState.waiting_availability, F.data.startswith("availability:")
 )
-async def on_availability_chosen(callback: CallbackQuery, state: FSMContext):
+async def on_availability_chosen(callback: CallbackQuery, state: FSMContext, lang: str):
     availability = callback.data.split(":")[1]
-    _, lang = await _get_user_lang(callback.from_user.id)
 
     await state.update_data(availability=availability)
     await state.set_state(SellerResponseState.waiting_comment)
@@ -119,175 +97,171 @@ async def on_availability_chosen(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(SellerResponseState.waiting_comment, F.data == "skip_comment")
-async def on_skip_comment(callback: CallbackQuery, state: FSMContext):
-    await _save_offer(callback.from_user.id, state, comment=None)
+async def on_skip_comment(
+    callback: CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+    user: UserProfile | None,
+    lang: str,
+):
+    await _save_offer(callback.from_user.id, state, session, user, lang, comment=None)
     await callback.answer()
 
 
 @router.message(SellerResponseState.waiting_comment)
-async def on_comment_entered(message: Message, state: FSMContext):
-    await _save_offer(message.from_user.id, state, comment=message.text)
+async def on_comment_entered(
+    message: Message,
+    state: FSMContext,
+    session: AsyncSession,
+    user: UserProfile | None,
+    lang: str,
+):
+    await _save_offer(message.from_user.id, state, session, user, lang, comment=message.text)
 
 
 async def _save_offer(
-    telegram_id: int, state: FSMContext, comment: str | None
+    telegram_id: int,
+    state: FSMContext,
+    session: AsyncSession,
+    user: UserProfile | None,
+    lang: str,
+    comment: str | None,
 ):
     from bot.loader import bot
 
     data = await state.get_data()
     await state.clear()
 
-    user, lang = await _get_user_lang(telegram_id)
     if not user:
         return
 
-    async with async_session() as session:
-        offer = await create_offer(
-            session=session,
-            request_id=data["request_id"],
-            seller_id=user.id,
-            price=data["price"],
-            currency=CurrencyEnum(data["currency"]),
-            availability=AvailabilityEnum(data["availability"]),
-            comment=comment,
-        )
-
-        if not offer:
-            await bot.send_message(telegram_id, t("already_responded", lang))
-            return
-
-        # Format offer confirmation for seller
-        currency_label = t(f"currency_{offer.currency.value}_label", lang)
-        availability_label = t(f"availability_{offer.availability.value}", lang)
-        comment_line = f"💬 {comment}" if comment else ""
-        price_formatted = f"{offer.price:,}".replace(",", " ")
+    result = await create_offer(
+        session=session,
+        request_id=data["request_id"],
+        seller_id=user.id,
+        price=data["price"],
+        currency=CurrencyEnum(data["currency"]),
+        availability=AvailabilityEnum(data["availability"]),
+        comment=comment,
+    )
 
-        await bot.send_message(
-            telegram_id,
-            t(
-                "offer_sent",
-                lang,
-                price=price_formatted,
-                currency=currency_label,
-                availability=availability_label,
-                comment_line=comment_line,
-            ),
-        )
+    if not result.offer:
+        await bot.send_message(telegram_id, t(result.error, lang))
+        return
+    offer = result.offer
+
+    # Format offer confirmation for seller
+    currency_label = t(f"currency_{offer.currency.value}_label", lang)
+    availability_label = t(f"availability_{offer.availability.value}", lang)
+    comment_line = f"💬 {comment}" if comment else ""
+    price_formatted = f"{offer.price:,}".replace(",", " ")
+
+    enqueue_message(
+        session,
+        telegram_id,
+        t(
+            "offer_sent",
+            lang,
+            price=price_formatted,
+            currency=currency_label,
+            availability=availability_label,
+            comment_line=comment_line,
+        ),
+    )
 
-        # Notify client about the new offer
-        result = await session.execute(
-            select(Request)
-            .options(selectinload(Request.client))
-            .where(Request.id == data["request_id"])
-        )
-        req = result.scalar_one_or_none()
-        if req and req.client:
-            client = req.client
-            client_lang = client.language.value if client.language else "ru"
-            client_currency = t(f"currency_{offer.currency.value}_label", client_lang)
-            client_availability = t(
-                f"availability_{offer.availability.value}", client_lang
-            )
-            client_comment_line = f"💬 {comment}" if comment else ""
-            client_price = f"{offer.price:,}".replace(",", " ")
-
-            notification_text = t(
-                "new_offer",
-                client_lang,
-                request_id=req.id,
-                brand=req.brand,
-                model=req.model,
-                year=req.year,
-                description=req.description,
-                seller_name=user.first_name or "Seller",
-                price=client_price,
-                currency=client_currency,
-                availability=client_availability,
-                comment_line=client_comment_line,
-            )
+    # Refresh the client's offer card; bursts are merged into one update
+    result = await session.execute(
+        select(User.telegram_id)
+        .join(Request, Request.client_id == User.id)
+        .where(Request.id == offer.request_id)
+    )
+    client_telegram_id = result.scalar_one_or_none()
+    if client_telegram_id:
+        await enqueue_offer_card(session, offer.request_id, client_telegram_id)
 
-            await bot.send_message(
-                client.telegram_id,
-                notification_text,
-                reply_markup=contact_seller_keyboard(offer.id, client_lang),
-            )
+    await session.commit()
 
 
 # --- "Пропустить" ---
 @router.callback_query(F.data.startswith("skip:"))
-async def on_skip_request(callback: CallbackQuery):
-    _, lang = await _get_user_lang(callback.from_user.id)
+async def on_skip_request(callback: CallbackQuery, lang: str):
     await callback.message.edit_reply_markup(reply_markup=None)
     await callback.message.reply(t("skipped", lang))
     await callback.answer()
 
 
 # --- "Активные запросы" ---
-@router.message(F.text.in_(["📋 Активные запросы", "📋 Faol so'rovlar"]))
-async def on_active_requests(message: Message):
-    user, lang = await _get_user_lang(message.from_user.id)
-    if not user:
-        return
-
-    async with async_session() as session:
-        # Get seller's brands
-        result = await session.execute(
-            select(SellerBrand.brand).where(SellerBrand.seller_id == user.id)
-        )
-        brands = [row[0] for row in result.all()]
-
-        if not brands:
-            await message.answer(t("no_seller_requests", lang))
-            return
-
-        # Get active requests for those brands not already answered
-        from sqlalchemy import and_, not_, exists
-
-        answered_subq = (
-            select(Offer.id)
-            .where(
-                and_(Offer.request_id == Request.id, Offer.seller_id == user.id)
-            )
-            .correlate(Request)
-            .exists()
-        )
-
-        result = await session.execute(
-            select(Request)
-            .where(
-                Request.brand.in_(brands),
-                Request.status == RequestStatusEnum.active,
-                ~answered_subq,
-            )
-            .order_by(Request.created_at.desc())
-        )
-        requests = result.scalars().all()
-
-    if not requests:
-        await message.answer(t("no_seller_requests", lang))
-        return
-
-    from bot.services._helpers import time_ago
+async def _seller_requests_page(
+    session: AsyncSession,
+    user: UserProfile,
+    lang: str,
+    cursor: str | None = None,
+    direction: str = "next",
+) -> tuple[str, InlineKeyboardMarkup | None]:
+    # Get seller's brands
+    brands = await seller_index.brands(session, user.id)
+    if not brands:
+        return t("no_seller_requests", lang), None
+
+    # Active requests for those brands not already answered, one page at a time
+    page = await get_seller_requests(session, user.id, brands, cursor, direction)
+    if not page["items"] and cursor:
+        # Everything past the cursor was answered or closed meanwhile; start from the top
+        page = await get_seller_requests(session, user.id, brands)
+    if not page["items"]:
+        return t("no_seller_requests", lang), None
 
     lines = [t("seller_requests_list", lang), ""]
     req_list = []
-    for i, req in enumerate(requests, 1):
-        part_type_text = t(f"part_type_{req.part_type.value}", lang)
-        ago = time_ago(req.created_at, lang)
+    for i, req in enumerate(page["items"], 1):
+        part_type_text = t(f"part_type_{req['part_type']}", lang)
+        ago = time_ago(req["created_at"], lang)
         lines.append(
             t(
                 "seller_request_item",
                 lang,
                 num=i,
-                brand=req.brand,
-                model=req.model,
-                year=req.year,
-                description=req.description,
+                brand=req["brand"],
+                model=req["model"],
+                year=req["year"],
+                description=truncate(req["description"]),
                 part_type=part_type_text,
                 time_ago=ago,
             )
         )
-        req_list.append((req.id, i))
+        req_list.append((req["id"], i))
+
+    keyboard = seller_active_requests_keyboard(
+        req_list, lang, page["prev"], page["next"]
+    )
+    return "\n".join(lines), keyboard
 
-    keyboard = seller_active_requests_keyboard(req_list, lang)
-    await message.answer("\n".join(lines), reply_markup=keyboard)
+
+@router.message(F.text.in_(["📋 Активные запросы", "📋 Faol so'rovlar"]))
+async def on_active_requests(
+    message: Message, session: AsyncSession, user: UserProfile | None, lang: str
+):
+    if not user:
+        return
+
+    text, keyboard = await _seller_requests_page(session, user, lang)
+    await message.answer(text, reply_markup=keyboard)
+
+
+@router.callback_query(F.data.startswith("seller_requests:"))
+async def on_active_requests_page(
+    callback: CallbackQuery, session: AsyncSession, user: UserProfile | None, lang: str
+):
+    if not user:
+        await callback.answer()
+        return
+
+    _, direction, cursor = callback.data.split(":")
+    text, keyboard = await _seller_requests_page(session, user, lang, cursor, direction)
+    try:
+        await callback.message.edit_text(text, reply_markup=keyboard)
+    except TelegramBadRequest as e:
+        # A double tap renders the same page twice
+        if "message is not modified" not in str(e):
+            raise
+    await callback.answer()
@@ -2,32 +2,25 @@ from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
-from sqlalchemy import delete, select
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.db.engine import async_session
 from bot.db.models import LanguageEnum, RoleEnum, SellerBrand, User
 from bot.keyboards.inline import brands_keyboard, language_keyboard, settings_keyboard
 from bot.keyboards.reply import client_menu, seller_menu
 from bot.locales import t
+from bot.services.cache_sync import publish_user_changed
+from bot.services.seller_index import seller_index
+from bot.services.user_cache import UserProfile, user_cache
 
 router = Router()
 
 
-async def _get_user(telegram_id: int) -> User | None:
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == telegram_id)
-        )
-        return result.scalar_one_or_none()
-
-
 # --- Settings menu ---
 @router.message(F.text.in_(["⚙️ Настройки", "⚙️ Sozlamalar"]))
-async def on_settings(message: Message):
-    user = await _get_user(message.from_user.id)
+async def on_settings(message: Message, user: UserProfile | None, lang: str):
     if not user:
         return
-    lang = user.language.value if user.language else "ru"
     is_seller = user.role == RoleEnum.seller
     await message.answer(
         t("settings_title", lang),
@@ -45,7 +38,9 @@ async def on_settings_language(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("lang:"))
-async def on_language_changed(callback: CallbackQuery, state: FSMContext):
+async def on_language_changed(
+    callback: CallbackQuery, state: FSMContext, session: AsyncSession, user: UserProfile | None
+):
     # This also handles language selection during registration (RegistrationState)
     # If there's FSM state active, let the start handler handle it
     current_state = await state.get_state()
@@ -54,18 +49,18 @@ async def on_language_changed(callback: CallbackQuery, state: FSMContext):
 
     lang = callback.data.split(":")[1]
 
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        user = result.scalar_one_or_none()
-        if not user:
-            await callback.answer()
-            return
+    if not user:
+        await callback.answer()
+        return
 
-        user.language = LanguageEnum(lang)
-        await session.commit()
-        role = user.role
+    await session.execute(
+        update(User).where(User.id == user.id).values(language=LanguageEnum(lang))
+    )
+    await publish_user_changed(session, user.id, user.telegram_id)
+    await session.commit()
+    user_cache.invalidate(user.telegram_id)
+    role = user.role
+    seller_index.set_language(user.id, lang)
 
     await callback.message.edit_text(t("language_changed", lang))
 
@@ -80,22 +75,27 @@ async def on_language_changed(callback: CallbackQuery, state: FSMContext):
 
 # --- Change brands (seller only) ---
 @router.callback_query(F.data == "settings:brands")
-async def on_settings_brands(callback: CallbackQuery, state: FSMContext):
-    user = await _get_user(callback.from_user.id)
+async def on_settings_brands(
+    callback: CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+    user: UserProfile | None,
+    lang: str,
+):
     if not user or user.role != RoleEnum.seller:
         await callback.answer()
         return
 
-    lang = user.language.value if user.language else "ru"
-
-    # Load current brands
-    async with async_session() as session:
-        result = await session.execute(
-            select(SellerBrand.brand).where(SellerBrand.seller_id == user.id)
-        )
-        current_brands = {row[0] for row in result.all()}
+    # From the database, not the seller index: another process may have changed
+    # them, and the Done handler replaces the whole list with this selection
+    result = await session.execute(
+        select(SellerBrand.brand).where(SellerBrand.seller_id == user.id)
+    )
+    current_brands = set(result.scalars().all())
 
-    await state.set_data({"editing_brands": True, "selected_brands": current_brands, "language": lang})
+    await state.set_data(
+        {"editing_brands": True, "selected_brands": sorted(current_brands), "language": lang}
+    )
     await callback.message.edit_text(
         t("choose_brands", lang),
         reply_markup=brands_keyboard(current_brands, lang),
@@ -111,14 +111,14 @@ async def on_brand_toggle_settings(callback: CallbackQuery, state: FSMContext):
 
     brand = callback.data.split(":", 1)[1]
     lang = data.get("language", "ru")
-    selected: set = data.get("selected_brands", set())
+    selected = set(data.get("selected_brands", []))
 
     if brand in selected:
         selected.discard(brand)
     else:
         selected.add(brand)
 
-    await state.update_data(selected_brands=selected)
+    await state.update_data(selected_brands=sorted(selected))
     await callback.message.edit_reply_markup(
         reply_markup=brands_keyboard(selected, lang)
     )
@@ -126,32 +126,35 @@ async def on_brand_toggle_settings(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data == "brands_done")
-async def on_brands_done_settings(callback: CallbackQuery, state: FSMContext):
+async def on_brands_done_settings(
+    callback: CallbackQuery, state: FSMContext, session: AsyncSession, user: UserProfile | None
+):
     data = await state.get_data()
     if not data.get("editing_brands"):
         return  # Let registration handler handle it
 
     lang = data.get("language", "ru")
-    selected: set = data.get("selected_brands", set())
+    selected = set(data.get("selected_brands", []))
 
     if not selected:
         await callback.answer(t("select_at_least_one", lang), show_alert=True)
         return
 
-    user = await _get_user(callback.from_user.id)
     if not user:
         await callback.answer()
         return
 
-    async with async_session() as session:
-        # Delete old brands
-        await session.execute(
-            delete(SellerBrand).where(SellerBrand.seller_id == user.id)
-        )
-        # Add new brands
-        for brand in selected:
-            session.add(SellerBrand(seller_id=user.id, brand=brand))
-        await session.commit()
+    # Delete old brands
+    await session.execute(
+        delete(SellerBrand).where(SellerBrand.seller_id == user.id)
+    )
+    # Add new brands
+    for brand in selected:
+        session.add(SellerBrand(seller_id=user.id, brand=brand))
+    await publish_user_changed(session, user.id, user.telegram_id)
+    await session.commit()
+
+    seller_index.set_seller(user.id, user.telegram_id, user.language, selected)
 
     await state.clear()
     brands_str = ", ".join(sorted(selected))
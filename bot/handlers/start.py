@@ -3,42 +3,40 @@ from aiogram.filters import CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
-from bot.db.engine import async_session
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from bot.db.models import LanguageEnum, RoleEnum, SellerBrand, User
 from bot.keyboards.inline import brands_keyboard, language_keyboard, role_keyboard
 from bot.keyboards.reply import client_menu, contact_keyboard, seller_menu
 from bot.locales import t
+from bot.services.cache_sync import publish_user_changed
+from bot.services.seller_index import seller_index
+from bot.services.user_cache import UserProfile, user_cache
 from bot.states import RegistrationState
 
-from sqlalchemy import select
-
 router = Router()
 
 
 @router.message(CommandStart())
-async def cmd_start(message: Message, state: FSMContext):
+async def cmd_start(
+    message: Message,
+    state: FSMContext,
+    session: AsyncSession,
+    user: UserProfile | None,
+    lang: str,
+):
     await state.clear()
     # Check if user already registered
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
-
     if user and user.role:
-        lang = user.language.value if user.language else "ru"
         if user.role == RoleEnum.client:
             await message.answer(
                 t("client_registered", lang), reply_markup=client_menu(lang)
             )
         else:
-            async with async_session() as session:
-                result = await session.execute(
-                    select(SellerBrand.brand).where(SellerBrand.seller_id == user.id)
-                )
-                brands = [row[0] for row in result.all()]
+            brands = await seller_index.brands(session, user.id)
             await message.answer(
-                t("seller_registered", lang, brands=", ".join(brands)),
+                t("seller_registered", lang, brands=", ".join(sorted(brands))),
                 reply_markup=seller_menu(lang),
             )
         return
@@ -50,27 +48,31 @@ async def cmd_start(message: Message, state: FSMContext):
 
 
 @router.callback_query(RegistrationState.waiting_language, F.data.startswith("lang:"))
-async def on_language_chosen(callback: CallbackQuery, state: FSMContext):
+async def on_language_chosen(
+    callback: CallbackQuery, state: FSMContext, session: AsyncSession, user: UserProfile | None
+):
     lang = callback.data.split(":")[1]
     await state.update_data(language=lang)
 
     # Create or update user with language
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        user = result.scalar_one_or_none()
-        if not user:
-            user = User(
+    if not user:
+        session.add(
+            User(
                 telegram_id=callback.from_user.id,
                 username=callback.from_user.username,
                 first_name=callback.from_user.first_name,
                 language=LanguageEnum(lang),
             )
-            session.add(user)
-        else:
-            user.language = LanguageEnum(lang)
+        )
         await session.commit()
+    else:
+        await session.execute(
+            update(User).where(User.id == user.id).values(language=LanguageEnum(lang))
+        )
+        await publish_user_changed(session, user.id, user.telegram_id)
+        await session.commit()
+        user_cache.invalidate(user.telegram_id)
+        seller_index.set_language(user.id, lang)
 
     await state.set_state(RegistrationState.waiting_contact)
     await callback.message.edit_text(t("choose_language") + " ✅")
@@ -81,20 +83,23 @@ async def on_language_chosen(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(RegistrationState.waiting_contact, F.contact)
-async def on_contact_shared(message: Message, state: FSMContext):
+async def on_contact_shared(
+    message: Message, state: FSMContext, session: AsyncSession, user: UserProfile | None
+):
     data = await state.get_data()
     lang = data.get("language", "ru")
 
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
+    if user:
+        await session.execute(
+            update(User)
+            .where(User.id == user.id)
+            .values(
+                phone_number=message.contact.phone_number,
+                first_name=message.contact.first_name or message.from_user.first_name,
+                username=message.from_user.username,
+            )
         )
-        user = result.scalar_one_or_none()
-        if user:
-            user.phone_number = message.contact.phone_number
-            user.first_name = message.contact.first_name or message.from_user.first_name
-            user.username = message.from_user.username
-            await session.commit()
+        await session.commit()
 
     first_name = message.contact.first_name or message.from_user.first_name or ""
     await state.update_data(first_name=first_name)
@@ -106,19 +111,20 @@ async def on_contact_shared(message: Message, state: FSMContext):
 
 
 @router.callback_query(RegistrationState.waiting_role, F.data.startswith("role:"))
-async def on_role_chosen(callback: CallbackQuery, state: FSMContext):
+async def on_role_chosen(
+    callback: CallbackQuery, state: FSMContext, session: AsyncSession, user: UserProfile | None
+):
     role = callback.data.split(":")[1]
     data = await state.get_data()
     lang = data.get("language", "ru")
 
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
+    if user:
+        await session.execute(
+            update(User).where(User.id == user.id).values(role=RoleEnum(role))
         )
-        user = result.scalar_one_or_none()
-        if user:
-            user.role = RoleEnum(role)
-            await session.commit()
+        await publish_user_changed(session, user.id, user.telegram_id)
+        await session.commit()
+        user_cache.invalidate(user.telegram_id)
 
     if role == "client":
         await state.clear()
@@ -128,7 +134,7 @@ async def on_role_chosen(callback: CallbackQuery, state: FSMContext):
         )
     else:
         await state.set_state(RegistrationState.waiting_brands)
-        await state.update_data(selected_brands=set())
+        await state.update_data(selected_brands=[])
         await callback.message.edit_text(
             t("choose_brands", lang), reply_markup=brands_keyboard(set(), lang)
         )
@@ -142,14 +148,15 @@ async def on_brand_toggle(callback: CallbackQuery, state: FSMContext):
     brand = callback.data.split(":", 1)[1]
     data = await state.get_data()
     lang = data.get("language", "ru")
-    selected: set = data.get("selected_brands", set())
+    selected = set(data.get("selected_brands", []))
 
     if brand in selected:
         selected.discard(brand)
     else:
         selected.add(brand)
 
-    await state.update_data(selected_brands=selected)
+    # Stored as a sorted list so any FSM storage can serialize it
+    await state.update_data(selected_brands=sorted(selected))
     await callback.message.edit_reply_markup(
         reply_markup=brands_keyboard(selected, lang)
     )
@@ -157,24 +164,23 @@ async def on_brand_toggle(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(RegistrationState.waiting_brands, F.data == "brands_done")
-async def on_brands_done(callback: CallbackQuery, state: FSMContext):
+async def on_brands_done(
+    callback: CallbackQuery, state: FSMContext, session: AsyncSession, user: UserProfile | None
+):
     data = await state.get_data()
     lang = data.get("language", "ru")
-    selected: set = data.get("selected_brands", set())
+    selected = set(data.get("selected_brands", []))
 
     if not selected:
         await callback.answer(t("select_at_least_one", lang), show_alert=True)
         return
 
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        user = result.scalar_one_or_none()
-        if user:
-            for brand in selected:
-                session.add(SellerBrand(seller_id=user.id, brand=brand))
-            await session.commit()
+    if user:
+        for brand in selected:
+            session.add(SellerBrand(seller_id=user.id, brand=brand))
+        await publish_user_changed(session, user.id, user.telegram_id)
+        await session.commit()
+        seller_index.set_seller(user.id, user.telegram_id, lang, selected)
 
     await state.clear()
     brands_str = ", ".join(sorted(selected))
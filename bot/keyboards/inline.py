@@ -1,22 +1,8 @@
-import json
-
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
 
 from bot.config import settings
 from bot.locales import t
-
-_BRANDS: list[str] = []
-
-
-def _get_brands() -> list[str]:
-    global _BRANDS
-    if not _BRANDS:
-        import pathlib
-
-        cars_path = pathlib.Path(__file__).resolve().parent.parent.parent / "data" / "cars.json"
-        with open(cars_path) as f:
-            _BRANDS = list(json.load(f).keys())
-    return _BRANDS
+from bot.services.catalog import cars_catalog
 
 
 def webapp_keyboard(lang: str = "ru") -> InlineKeyboardMarkup:
@@ -56,7 +42,7 @@ def brands_keyboard(
     selected: set[str] | None = None, lang: str = "ru"
 ) -> InlineKeyboardMarkup:
     selected = selected or set()
-    brands = _get_brands()
+    brands = cars_catalog.snapshot().brands
     rows: list[list[InlineKeyboardButton]] = []
     row: list[InlineKeyboardButton] = []
     for brand in brands:
@@ -145,21 +131,6 @@ def skip_comment_keyboard(lang: str = "ru") -> InlineKeyboardMarkup:
     )
 
 
-def contact_seller_keyboard(
-    offer_id: int, lang: str = "ru"
-) -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text=t("contact_seller", lang),
-                    callback_data=f"contact:{offer_id}",
-                )
-            ]
-        ]
-    )
-
-
 def request_detail_keyboard(
     offers: list[tuple[int, str]], request_id: int, lang: str = "ru"
 ) -> InlineKeyboardMarkup:
@@ -185,8 +156,30 @@ def request_detail_keyboard(
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
+def _pager_row(
+    prefix: str, prev_cursor: str | None, next_cursor: str | None, lang: str
+) -> list[InlineKeyboardButton]:
+    row = []
+    if prev_cursor:
+        row.append(
+            InlineKeyboardButton(
+                text=t("page_prev", lang), callback_data=f"{prefix}:prev:{prev_cursor}"
+            )
+        )
+    if next_cursor:
+        row.append(
+            InlineKeyboardButton(
+                text=t("page_next", lang), callback_data=f"{prefix}:next:{next_cursor}"
+            )
+        )
+    return row
+
+
 def my_requests_keyboard(
-    requests: list[tuple[int, int]], lang: str = "ru"
+    requests: list[tuple[int, int]],
+    lang: str = "ru",
+    prev_cursor: str | None = None,
+    next_cursor: str | None = None,
 ) -> InlineKeyboardMarkup:
     """requests: list of (request_id, display_num)"""
     rows = [
@@ -198,11 +191,17 @@ def my_requests_keyboard(
         ]
         for req_id, _ in requests
     ]
+    pager = _pager_row("my_requests", prev_cursor, next_cursor, lang)
+    if pager:
+        rows.append(pager)
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
 def seller_active_requests_keyboard(
-    requests: list[tuple[int, int]], lang: str = "ru"
+    requests: list[tuple[int, int]],
+    lang: str = "ru",
+    prev_cursor: str | None = None,
+    next_cursor: str | None = None,
 ) -> InlineKeyboardMarkup:
     """requests: list of (request_id, display_num)"""
     rows = [
@@ -214,6 +213,9 @@ def seller_active_requests_keyboard(
         ]
         for req_id, _ in requests
     ]
+    pager = _pager_row("seller_requests", prev_cursor, next_cursor, lang)
+    if pager:
+        rows.append(pager)
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
@@ -1,13 +1,15 @@
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 
 from bot.config import settings
+from bot.middlewares.db import DbSessionMiddleware
+from bot.storage import create_storage
 
 bot = Bot(
     token=settings.BOT_TOKEN,
     default=DefaultBotProperties(parse_mode=ParseMode.HTML),
 )
-storage = MemoryStorage()
+storage = create_storage()
 dp = Dispatcher(storage=storage)
+dp.update.outer_middleware(DbSessionMiddleware())
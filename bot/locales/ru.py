@@ -72,16 +72,12 @@ TEXTS = {
         "{comment_line}\n"
         "Если клиент заинтересуется — он свяжется с вами."
     ),
-    "new_offer": (
-        "💰 Новое предложение по запросу #{request_id}!\n\n"
+    "offer_card": (
+        "💰 Предложения по запросу #{request_id} ({count})\n\n"
         "🚗 {brand} {model} ({year})\n"
-        "📋 {description}\n\n"
-        "👤 {seller_name}\n"
-        "💵 {price} {currency}\n"
-        "📍 {availability}\n"
-        "{comment_line}"
+        "📋 {description}\n"
     ),
-    "contact_seller": "📞 Связаться",
+    "offer_card_more": "…и ещё {count}",
     "seller_contacts": (
         "📞 Контакты продавца:\n\n"
         "👤 {seller_name}\n"
@@ -117,6 +113,7 @@ TEXTS = {
         "Предложений пока нет."
     ),
     "offer_line": "{num}. {seller_name} — {price} {currency} · {availability}",
+    "offer_comment_line": "    💬 {comment}",
     "contact_btn": "📞 Связаться: {seller_name}",
     "close_request_btn": "❌ Закрыть запрос",
     "request_closed": "Запрос #{request_id} закрыт.",
@@ -130,6 +127,8 @@ TEXTS = {
         "   📦 {part_type} · {time_ago}"
     ),
     "respond_btn": "💰 Ответить #{request_id}",
+    "page_prev": "◀️ Назад",
+    "page_next": "Далее ▶️",
     "settings_title": "⚙️ Настройки",
     "change_language": "🌐 Сменить язык",
     "change_brands": "📝 Изменить бренды",
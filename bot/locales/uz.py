@@ -72,16 +72,12 @@ TEXTS = {
         "{comment_line}\n"
         "Mijoz qiziqsa — siz bilan bog'lanadi."
     ),
-    "new_offer": (
-        "💰 So'rov #{request_id} bo'yicha yangi taklif!\n\n"
+    "offer_card": (
+        "💰 So'rov #{request_id} bo'yicha takliflar ({count})\n\n"
         "🚗 {brand} {model} ({year})\n"
-        "📋 {description}\n\n"
-        "👤 {seller_name}\n"
-        "💵 {price} {currency}\n"
-        "📍 {availability}\n"
-        "{comment_line}"
+        "📋 {description}\n"
     ),
-    "contact_seller": "📞 Bog'lanish",
+    "offer_card_more": "…va yana {count} ta",
     "seller_contacts": (
         "📞 Sotuvchi kontaktlari:\n\n"
         "👤 {seller_name}\n"
@@ -117,6 +113,7 @@ TEXTS = {
         "Hozircha takliflar yo'q."
     ),
     "offer_line": "{num}. {seller_name} — {price} {currency} · {availability}",
+    "offer_comment_line": "    💬 {comment}",
     "contact_btn": "📞 Bog'lanish: {seller_name}",
     "close_request_btn": "❌ So'rovni yopish",
     "request_closed": "So'rov #{request_id} yopildi.",
@@ -130,6 +127,8 @@ TEXTS = {
         "   📦 {part_type} · {time_ago}"
     ),
     "respond_btn": "💰 Javob berish #{request_id}",
+    "page_prev": "◀️ Orqaga",
+    "page_next": "Keyingi ▶️",
     "settings_title": "⚙️ Sozlamalar",
     "change_language": "🌐 Tilni o'zgartirish",
     "change_brands": "📝 Brendlarni o'zgartirish",
@@ -1,44 +1,140 @@
+import argparse
 import asyncio
 import logging
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
 
 import uvicorn
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.db.engine import async_session
+from bot.config import settings
+from bot.db.engine import background_session, pool_stats
 from bot.handlers import register_routers
 from bot.loader import bot, dp
-from bot.services.request_service import expire_old_requests
+from bot.services.cache_sync import start_listen_task
+from bot.services.idempotency_service import purge_expired_keys
+from bot.services.outbox import purge_sent, run_outbox_workers
+from bot.services.photo_service import purge_unreferenced_blobs
+from bot.services.request_service import expire_old_requests, next_expiry
+from bot.services.seller_index import seller_index, start_reconcile_task
+from bot.services.user_cache import user_cache
+from bot.storage import purge_expired_fsm
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+async def periodic(
+    name: str, interval: float, job: Callable[[AsyncSession], Awaitable[int]]
+) -> None:
+    """Background task: run a cleanup `job` every `interval` seconds.
+    The job gets a background session and returns the number of rows it removed.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with background_session() as session:
+                purged = await job(session)
+            if purged:
+                logger.info("Purged %d %s", purged, name)
+        except Exception as e:
+            logger.error("Error purging %s: %s", name, e)
+
+
 async def expire_requests_loop():
-    """Background task: expire old requests every hour."""
+    """Background task: expire requests as their deadlines pass.
+    Sleeps until the earliest active expires_at instead of polling.
+    """
     while True:
-        await asyncio.sleep(3600)
+        next_at = None
         try:
-            async with async_session() as session:
-                count = await expire_old_requests(session)
+            async with background_session() as session:
+                count = await expire_old_requests(session, settings.EXPIRY_CHUNK_SIZE)
                 if count:
                     logger.info("Expired %d requests", count)
+                next_at = await next_expiry(session)
         except Exception as e:
             logger.error("Error expiring requests: %s", e)
 
+        delay = settings.EXPIRY_MAX_SLEEP_SECONDS
+        if next_at is not None:
+            if next_at.tzinfo is None:
+                next_at = next_at.replace(tzinfo=timezone.utc)
+            until_next = (next_at - datetime.now(timezone.utc)).total_seconds()
+            delay = min(delay, max(1.0, until_next + 1))
+        await asyncio.sleep(delay)
+
+
+async def pool_stats_loop():
+    """Background task: log connection pool and user cache usage."""
+    while True:
+        await asyncio.sleep(settings.DB_POOL_STATS_INTERVAL)
+        for name, stats in pool_stats().items():
+            logger.info(
+                "DB pool %s: size=%d checked_out=%d checked_in=%d overflow=%d",
+                name, stats["size"], stats["checked_out"],
+                stats["checked_in"], stats["overflow"],
+            )
+        stats = user_cache.stats()
+        logger.info(
+            "User cache: size=%d hits=%d misses=%d",
+            stats["size"], stats["hits"], stats["misses"],
+        )
+
 
-async def main():
+def start_job_tasks():
+    """Jobs handed off through the database: expiry and outbox delivery.
+    Safe to run in several processes (rows are claimed with SKIP LOCKED).
+    """
+    asyncio.create_task(expire_requests_loop())
+    asyncio.create_task(run_outbox_workers())
+    asyncio.create_task(periodic("sent outbox messages", 3600, purge_sent))
+    asyncio.create_task(periodic("expired idempotency keys", 3600, purge_expired_keys))
+    asyncio.create_task(
+        periodic("unreferenced photo blobs", 3600, purge_unreferenced_blobs)
+    )
+    if settings.FSM_STORAGE == "postgres":
+        asyncio.create_task(periodic("expired FSM states", 3600, purge_expired_fsm))
+
+
+def start_process_tasks():
+    """Per-process upkeep for the in-memory caches and pool stats."""
+    start_reconcile_task()
+    start_listen_task()
+    if settings.DB_POOL_STATS_INTERVAL:
+        asyncio.create_task(pool_stats_loop())
+
+
+async def prepare_bot():
     register_routers(dp)
 
-    # Create FastAPI app
+    async with background_session() as session:
+        await seller_index.load(session)
+
+
+def api_server() -> uvicorn.Server:
     from api.app import create_app
 
-    app = create_app()
+    config = uvicorn.Config(
+        create_app(), host=settings.API_HOST, port=settings.API_PORT, log_level="info"
+    )
+    return uvicorn.Server(config)
 
-    # Configure uvicorn
-    config = uvicorn.Config(app, host="0.0.0.0", port=8000, log_level="info")
-    server = uvicorn.Server(config)
 
-    # Run expiry background task
-    asyncio.create_task(expire_requests_loop())
+async def run_all():
+    """Bot, API and jobs in one process, for small deployments."""
+    await prepare_bot()
+    server = api_server()
+    start_job_tasks()
+    start_process_tasks()
+
+    if settings.BOT_MODE == "webhook":
+        # Updates arrive through the API app, which starts its own consumers
+        from bot.webhook import set_webhook
+
+        await set_webhook()
+        await server.serve()
+        return
 
     # Run bot polling and uvicorn concurrently
     await asyncio.gather(
@@ -47,5 +143,74 @@ async def main():
     )
 
 
+async def run_bot():
+    """Telegram updates only. In webhook mode this serves the same app as the
+    API role, so nginx can route WEBHOOK_PATH here and /api elsewhere.
+    """
+    await prepare_bot()
+    start_process_tasks()
+
+    if settings.BOT_MODE == "webhook":
+        from bot.webhook import set_webhook
+
+        await set_webhook()
+        await api_server().serve()
+        return
+
+    await dp.start_polling(bot)
+
+
+async def run_worker():
+    """Background jobs only; seller fan-out needs the seller index."""
+    async with background_session() as session:
+        await seller_index.load(session)
+    start_job_tasks()
+    start_process_tasks()
+    await asyncio.Event().wait()
+
+
+def run_api():
+    """HTTP API only, with API_WORKERS uvicorn processes."""
+    if (
+        settings.BOT_MODE == "webhook"
+        and settings.FSM_STORAGE == "memory"
+        and settings.API_WORKERS > 1
+    ):
+        # Each process would keep its own conversations; the next update of a
+        # registration or offer flow may land in a process that never saw it
+        raise RuntimeError(
+            "BOT_MODE=webhook with API_WORKERS > 1 needs FSM_STORAGE=redis or postgres"
+        )
+    uvicorn.run(
+        "api.app:create_app",
+        factory=True,
+        host=settings.API_HOST,
+        port=settings.API_PORT,
+        workers=settings.API_WORKERS,
+        log_level="info",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AutoQuotes bot, API and workers")
+    parser.add_argument(
+        "role",
+        nargs="?",
+        default="all",
+        choices=["all", "bot", "api", "worker"],
+        help="what this process runs (default: everything)",
+    )
+    role = parser.parse_args().role
+
+    if role == "api":
+        run_api()
+    elif role == "bot":
+        asyncio.run(run_bot())
+    elif role == "worker":
+        asyncio.run(run_worker())
+    else:
+        asyncio.run(run_all())
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
@@ -0,0 +1,34 @@
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.db.engine import async_session
+from bot.services.user_cache import user_cache
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """Open one session per update and resolve the sending user once.
+    Handlers receive `session`, `user` (a cached UserProfile, None if not
+    registered) and `lang`. The session only checks out a connection when
+    a handler actually queries, so a cache hit costs no round trip.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        async with async_session() as session:
+            user = None
+            from_user = data.get("event_from_user")
+            if from_user:
+                user = await user_cache.get(session, from_user.id)
+                # Don't hold a pooled connection while handlers call Telegram
+                await session.commit()
+
+            data["session"] = session
+            data["user"] = user
+            data["lang"] = user.language if user else "ru"
+            return await handler(event, data)
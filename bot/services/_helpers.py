@@ -27,3 +27,11 @@ def format_offers_count(count: int, lang: str = "ru") -> str:
     if 2 <= count <= 4:
         return t("offers_count_2_4", lang, count=count)
     return t("offers_count", lang, count=count)
+
+
+# Characters of a seller's comment shown under each offer line
+OFFER_COMMENT_PREVIEW = 80
+
+
+def truncate(text: str, limit: int = 100) -> str:
+    return text if len(text) <= limit else text[: limit - 1].rstrip() + "…"
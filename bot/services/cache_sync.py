@@ -0,0 +1,94 @@
+import asyncio
+import logging
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.config import settings
+from bot.db.engine import background_session
+from bot.services.seller_index import seller_index
+from bot.services.user_cache import user_cache
+
+logger = logging.getLogger(__name__)
+
+# Payload "<user id>:<telegram id>", sent when a user's role, language or
+# seller brands change. Every bot, webhook and worker process listens.
+CHANNEL = "autoquotes_user_changed"
+
+_listen_task: asyncio.Task | None = None
+# Keeps refresh tasks referenced until they finish
+_pending: set[asyncio.Task] = set()
+
+
+async def publish_user_changed(session: AsyncSession, user_id: int, telegram_id: int) -> None:
+    """Queue a change notice in the caller's transaction; Postgres delivers it
+    to every listening process (this one included) only once it commits.
+    """
+    if session.bind.dialect.name != "postgresql":
+        return
+    await session.execute(select(func.pg_notify(CHANNEL, f"{user_id}:{telegram_id}")))
+
+
+def _on_notify(connection, pid: int, channel: str, payload: str) -> None:
+    try:
+        user_id, telegram_id = (int(part) for part in payload.split(":"))
+    except ValueError:
+        logger.warning("Ignoring malformed %s payload: %r", CHANNEL, payload)
+        return
+    user_cache.invalidate(telegram_id)
+    task = asyncio.create_task(_refresh_seller(user_id))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def _refresh_seller(seller_id: int) -> None:
+    try:
+        async with background_session() as session:
+            await seller_index.refresh_seller(session, seller_id)
+    except Exception as e:
+        logger.error("Error refreshing seller %d in the index: %s", seller_id, e)
+
+
+async def _resync() -> None:
+    """Notices sent while this process wasn't listening are lost; start over."""
+    user_cache.clear()
+    async with background_session() as session:
+        await seller_index.reconcile(session)
+
+
+async def listen_loop() -> None:
+    """Background task: apply other processes' user changes to this process's
+    caches over a dedicated LISTEN connection, reconnecting if it drops.
+    Until it reconnects, USER_CACHE_TTL_SECONDS bounds the staleness.
+    """
+    import asyncpg
+
+    url = make_url(settings.DATABASE_URL)
+    dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+    while True:
+        try:
+            connection = await asyncpg.connect(dsn)
+            try:
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(CHANNEL, _on_notify)
+                await _resync()
+                await closed.wait()
+            finally:
+                await connection.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Cache sync listener error: %s", e)
+        await asyncio.sleep(5)
+
+
+def start_listen_task() -> asyncio.Task | None:
+    """Start listen_loop once per process; only Postgres supports it."""
+    global _listen_task
+    if make_url(settings.DATABASE_URL).get_backend_name() != "postgresql":
+        return None
+    if _listen_task is None or _listen_task.done():
+        _listen_task = asyncio.create_task(listen_loop())
+    return _listen_task
@@ -0,0 +1,67 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import threading
+from typing import NamedTuple
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+CARS_PATH = pathlib.Path(__file__).resolve().parent.parent.parent / "data" / "cars.json"
+
+
+class CatalogSnapshot(NamedTuple):
+    mtime_ns: int
+    data: dict[str, list[str]]
+    brands: list[str]
+    body: bytes
+    gzip: bytes
+    br: bytes | None
+    etag: str
+
+
+class CarsCatalog:
+    """data/cars.json loaded once per file version: the parsed catalog for the
+    bot plus pre-serialized (and pre-compressed) bytes for the API.
+    A newer mtime triggers a reload on the next access.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self._snapshot: CatalogSnapshot | None = None
+        self._lock = threading.Lock()
+
+    def _build(self, mtime_ns: int) -> CatalogSnapshot:
+        with open(self.path, "rb") as f:
+            data = json.load(f)
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+        return CatalogSnapshot(
+            mtime_ns=mtime_ns,
+            data=data,
+            brands=list(data.keys()),
+            body=body,
+            gzip=gzip.compress(body, compresslevel=9, mtime=0),
+            br=brotli.compress(body, quality=11) if brotli else None,
+            etag='"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+        )
+
+    def snapshot(self) -> CatalogSnapshot:
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.mtime_ns == mtime_ns:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.mtime_ns != mtime_ns:
+                self._snapshot = self._build(mtime_ns)
+                logger.info("Cars catalog loaded: %d brands", len(self._snapshot.brands))
+            return self._snapshot
+
+
+cars_catalog = CarsCatalog(CARS_PATH)
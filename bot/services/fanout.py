@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Awaitable, Callable, Iterable, TypeVar
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, at most `capacity` stored."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    @property
+    def idle(self) -> bool:
+        self._refill()
+        return self._tokens >= self.capacity and not self._lock.locked()
+
+    async def acquire(self, cost: float = 1.0) -> None:
+        cost = min(cost, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= cost:
+                    self._tokens -= cost
+                    return
+                await asyncio.sleep((cost - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Drain the bucket so no token is available for `seconds`."""
+        self._refill()
+        self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+class RateLimiter:
+    """Global bot-wide bucket plus one bucket per chat."""
+
+    MAX_CHAT_BUCKETS = 10_000
+
+    def __init__(self, global_rate: float, chat_rate: float, chat_burst: float):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_rate = chat_rate
+        self._chat_burst = chat_burst
+        self._chats: dict[int, TokenBucket] = {}
+
+    def chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self.MAX_CHAT_BUCKETS:
+                self._chats = {
+                    cid: b for cid, b in self._chats.items() if not b.idle
+                }
+            bucket = TokenBucket(self._chat_rate, self._chat_burst)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    async def acquire(self, chat_id: int, cost: float = 1.0) -> None:
+        # Per-chat first: a throttled chat must not hold global tokens while it waits
+        await self.chat_bucket(chat_id).acquire(cost)
+        await self.global_bucket.acquire(cost)
+
+
+# Buckets are process-local, so the limits are split between the worker
+# processes; any of them may claim any chat's messages from the outbox.
+_share = max(1, settings.OUTBOX_PROCESSES)
+limiter = RateLimiter(
+    global_rate=settings.TG_GLOBAL_RATE / _share,
+    chat_rate=settings.TG_CHAT_RATE / _share,
+    chat_burst=max(1.0, settings.TG_CHAT_BURST / _share),
+)
+
+
+async def deliver(
+    chat_id: int, call: Callable[[], Awaitable[R]], cost: float = 1.0
+) -> R:
+    """Run a single Telegram API call for `chat_id` under the rate limiter.
+    On flood control the chat is paused for `retry_after` and the call retried.
+    """
+    for attempt in range(settings.TG_MAX_RETRY_AFTER_ATTEMPTS):
+        await limiter.acquire(chat_id, cost)
+        try:
+            return await call()
+        except TelegramRetryAfter as e:
+            logger.warning(
+                "Flood control for chat %s, retry in %ss (attempt %d)",
+                chat_id, e.retry_after, attempt + 1,
+            )
+            limiter.chat_bucket(chat_id).pause(e.retry_after)
+    await limiter.acquire(chat_id, cost)
+    return await call()
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def fan_out(
+    recipients: Iterable[T],
+    send: Callable[[T], Awaitable[None]],
+    concurrency: int | None = None,
+) -> dict:
+    """Call `send` for every recipient with bounded concurrency.
+    Returns a delivery report with latency percentiles (seconds since start).
+    """
+    recipients = list(recipients)
+    semaphore = asyncio.Semaphore(concurrency or settings.FANOUT_CONCURRENCY)
+    started = time.monotonic()
+    latencies: list[float] = []
+    failed = 0
+
+    async def _one(recipient: T) -> None:
+        nonlocal failed
+        async with semaphore:
+            try:
+                await send(recipient)
+            except Exception as e:
+                failed += 1
+                logger.warning("Fan-out send failed: %s", e)
+                return
+            latencies.append(time.monotonic() - started)
+
+    await asyncio.gather(*(_one(r) for r in recipients))
+
+    latencies.sort()
+    return {
+        "total": len(recipients),
+        "sent": len(latencies),
+        "failed": failed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "duration": time.monotonic() - started,
+    }
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.config import settings
+from bot.db.models import IdempotencyKey
+
+
+async def find_replay(session: AsyncSession, client_id: int, key: str) -> int | None:
+    """request_id already created under this key, if it hasn't expired."""
+    result = await session.execute(
+        select(IdempotencyKey.request_id).where(
+            IdempotencyKey.client_id == client_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.expires_at > datetime.now(timezone.utc),
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+async def claim_key(
+    session: AsyncSession, client_id: int, key: str, request_id: int
+) -> int | None:
+    """Bind `key` to a request in the caller's transaction. Returns the
+    request_id of a concurrent submission that claimed it first (the caller
+    must roll back), None if this one owns it. Expired keys are reused.
+    """
+    now = datetime.now(timezone.utc)
+    stmt = pg_insert(IdempotencyKey).values(
+        client_id=client_id,
+        key=key,
+        request_id=request_id,
+        expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+    )
+    # A concurrent insert of the same key waits here until the first commits
+    result = await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[IdempotencyKey.client_id, IdempotencyKey.key],
+            set_={"request_id": stmt.excluded.request_id, "expires_at": stmt.excluded.expires_at},
+            where=IdempotencyKey.expires_at <= now,
+        ).returning(IdempotencyKey.request_id)
+    )
+    if result.scalar_one_or_none() is not None:
+        return None
+    return await find_replay(session, client_id, key)
+
+
+async def purge_expired_keys(session: AsyncSession) -> int:
+    result = await session.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.now(timezone.utc))
+    )
+    await session.commit()
+    return result.rowcount
+
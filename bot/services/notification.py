@@ -1,29 +1,33 @@
-import pathlib
+from datetime import datetime, timezone
+from html import escape
 
-from aiogram.types import FSInputFile, InputMediaPhoto
-from sqlalchemy import select
+from aiogram.exceptions import TelegramBadRequest
+from sqlalchemy import select, update
 from sqlalchemy.orm import selectinload
 
-from bot.db.engine import async_session
+from bot.db.engine import background_session
+from bot.config import settings
 from bot.db.models import (
+    Offer,
+    OutboxMessage,
+    OutboxStatusEnum,
     Request,
-    RequestPhoto,
-    SellerBrand,
-    User,
 )
-from bot.keyboards.inline import request_notification_keyboard
+from bot.keyboards.inline import request_detail_keyboard, request_notification_keyboard
 from bot.locales import t
+from bot.services._helpers import OFFER_COMMENT_PREVIEW, truncate
+from bot.services.fanout import deliver
+from bot.services.outbox import enqueue_many, enqueue_message
+from bot.services.seller_index import seller_index
 
-UPLOADS_DIR = pathlib.Path(__file__).resolve().parent.parent.parent / "uploads"
 
-
-async def notify_sellers(request_id: int) -> int:
-    """Send notification to sellers matching the request brand.
-    Returns the number of sellers notified.
+async def notify_sellers(request_id: int, job_id: int | None = None) -> int:
+    """Queue notifications to the client and to sellers matching the request brand.
+    Returns the number of sellers queued; delivery is done by the outbox workers.
+    `job_id` is the outbox row that scheduled this fan-out; it is marked sent in
+    the same transaction so a retried job never queues sellers twice.
     """
-    from bot.loader import bot
-
-    async with async_session() as session:
+    async with background_session() as session:
         # Load request with photos
         result = await session.execute(
             select(Request)
@@ -35,14 +39,9 @@ async def notify_sellers(request_id: int) -> int:
             return 0
 
         # Find sellers for this brand
-        result = await session.execute(
-            select(User)
-            .join(SellerBrand, SellerBrand.seller_id == User.id)
-            .where(SellerBrand.brand == req.brand)
-        )
-        sellers = result.scalars().all()
+        sellers = await seller_index.sellers(session, req.brand)
 
-        # Send confirmation to client
+        # Confirmation to client
         client = req.client
         lang = client.language.value if client.language else "ru"
         part_type_text = t(f"part_type_{req.part_type.value}", lang)
@@ -70,12 +69,15 @@ async def notify_sellers(request_id: int) -> int:
                 part_type=part_type_text,
             )
 
-        await bot.send_message(client.telegram_id, text)
+        enqueue_message(session, client.telegram_id, text)
 
-        # Notify each seller
-        notified = 0
+        # Notification to sellers: render once per language, not once per seller
+        chat_ids_by_lang: dict[str, list[int]] = {}
         for seller in sellers:
-            seller_lang = seller.language.value if seller.language else "ru"
+            chat_ids_by_lang.setdefault(seller.language, []).append(seller.telegram_id)
+
+        photo_ids = [photo.id for photo in req.photos]
+        for seller_lang, chat_ids in chat_ids_by_lang.items():
             seller_part_type = t(f"part_type_{req.part_type.value}", seller_lang)
             notification_text = t(
                 "new_request_notification",
@@ -87,26 +89,124 @@ async def notify_sellers(request_id: int) -> int:
                 description=req.description,
                 part_type=seller_part_type,
             )
-            keyboard = request_notification_keyboard(req.id, seller_lang)
-
-            try:
-                # Send photos as media group if any
-                if req.photos:
-                    media = []
-                    for photo in req.photos:
-                        photo_path = UPLOADS_DIR / photo.file_path
-                        if photo_path.exists():
-                            media.append(InputMediaPhoto(media=FSInputFile(photo_path)))
-                    if media:
-                        await bot.send_media_group(seller.telegram_id, media)
-
-                await bot.send_message(
-                    seller.telegram_id,
-                    notification_text,
-                    reply_markup=keyboard,
+            enqueue_many(
+                session,
+                chat_ids,
+                notification_text,
+                reply_markup=request_notification_keyboard(req.id, seller_lang),
+                photo_ids=photo_ids,
+                request_id=req.id,
+            )
+
+        if job_id is not None:
+            await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id == job_id)
+                .values(
+                    status=OutboxStatusEnum.sent,
+                    sent_at=datetime.now(timezone.utc),
                 )
-                notified += 1
-            except Exception:
-                pass
+            )
+
+        await session.commit()
+        return len(sellers)
+
+
+async def send_offer_card(request_id: int, chat_id: int) -> None:
+    """Send or edit in place the client's summary of all offers on a request."""
+    from bot.loader import bot
 
-        return notified
+    # Read everything up front: deliver() may wait on rate limits, and the
+    # background pool is too small to hold a connection across that
+    async with background_session() as session:
+        result = await session.execute(
+            select(Request)
+            .options(
+                selectinload(Request.client),
+                selectinload(Request.offers).selectinload(Offer.seller),
+            )
+            .where(Request.id == request_id)
+        )
+        req = result.scalar_one_or_none()
+        if not req or not req.offers:
+            return
+
+        lang = req.client.language.value if req.client.language else "ru"
+        offers = sorted(req.offers, key=lambda o: (o.currency.value, o.price))
+        shown = offers[: settings.OFFER_CARD_MAX_OFFERS]
+
+        lines = [
+            t(
+                "offer_card",
+                lang,
+                request_id=req.id,
+                brand=escape(req.brand),
+                model=escape(req.model),
+                year=req.year,
+                description=escape(req.description),
+                count=len(offers),
+            )
+        ]
+        offer_btns = []
+        for i, offer in enumerate(shown, 1):
+            seller_name = offer.seller.first_name or "Seller"
+            lines.append(
+                t(
+                    "offer_line",
+                    lang,
+                    num=i,
+                    seller_name=escape(seller_name),
+                    price=f"{offer.price:,}".replace(",", " "),
+                    currency=t(f"currency_{offer.currency.value}_label", lang),
+                    availability=t(f"availability_{offer.availability.value}", lang),
+                )
+            )
+            if offer.comment:
+                # Truncate first so an entity is never cut in half
+                comment = escape(truncate(offer.comment, OFFER_COMMENT_PREVIEW))
+                lines.append(t("offer_comment_line", lang, comment=comment))
+            offer_btns.append((offer.id, seller_name))
+        if len(offers) > len(shown):
+            lines.append(t("offer_card_more", lang, count=len(offers) - len(shown)))
+        card_message_id = req.offer_card_message_id
+
+    text = "\n".join(lines)
+    keyboard = request_detail_keyboard(offer_btns, request_id, lang)
+
+    if card_message_id:
+        try:
+            await deliver(
+                chat_id,
+                lambda: bot.edit_message_text(
+                    text=text,
+                    chat_id=chat_id,
+                    message_id=card_message_id,
+                    reply_markup=keyboard,
+                ),
+            )
+            return
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e):
+                return
+            # Card was deleted or is too old to edit; send a new one below
+
+    message = await deliver(
+        chat_id,
+        lambda: bot.send_message(chat_id, text, reply_markup=keyboard),
+    )
+    async with background_session() as session:
+        result = await session.execute(
+            update(Request)
+            .where(
+                Request.id == request_id,
+                Request.offer_card_message_id.is_not_distinct_from(card_message_id),
+            )
+            .values(offer_card_message_id=message.message_id)
+        )
+        await session.commit()
+    if result.rowcount == 0:
+        # Another worker replaced the card meanwhile; keep only one of them
+        try:
+            await deliver(chat_id, lambda: bot.delete_message(chat_id, message.message_id))
+        except TelegramBadRequest:
+            pass
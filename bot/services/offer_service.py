@@ -1,4 +1,8 @@
-from sqlalchemy import select
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from sqlalchemy import cast, exists, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.db.models import (
@@ -11,6 +15,32 @@ from bot.db.models import (
 )
 
 
+class OfferResult(NamedTuple):
+    offer: Offer | None
+    # Locale key explaining why no offer was created
+    error: str | None = None
+
+
+async def check_can_offer(
+    session: AsyncSession, request_id: int, seller_id: int
+) -> str | None:
+    """One-query probe: the reason the seller can't respond, or None."""
+    result = await session.execute(
+        select(
+            Request.status,
+            exists().where(
+                Offer.request_id == Request.id, Offer.seller_id == seller_id
+            ),
+        ).where(Request.id == request_id)
+    )
+    row = result.one_or_none()
+    if not row or row[0] != RequestStatusEnum.active:
+        return "request_not_active"
+    if row[1]:
+        return "already_responded"
+    return None
+
+
 async def create_offer(
     session: AsyncSession,
     request_id: int,
@@ -19,36 +49,38 @@ async def create_offer(
     currency: CurrencyEnum,
     availability: AvailabilityEnum,
     comment: str | None = None,
-) -> Offer | None:
-    # Check request is active
+) -> OfferResult:
+    """Insert the offer in a single statement, only if the request is still
+    active and the seller hasn't responded yet. The caller commits.
+    """
+    source = select(
+        Request.id,
+        literal(seller_id),
+        literal(price),
+        # Enum values need an explicit cast inside INSERT ... SELECT
+        cast(literal(currency, Offer.currency.type), Offer.currency.type),
+        cast(literal(availability, Offer.availability.type), Offer.availability.type),
+        literal(comment, Offer.comment.type),
+        literal(datetime.now(timezone.utc), Offer.created_at.type),
+    ).where(Request.id == request_id, Request.status == RequestStatusEnum.active)
     result = await session.execute(
-        select(Request).where(Request.id == request_id)
-    )
-    req = result.scalar_one_or_none()
-    if not req or req.status != RequestStatusEnum.active:
-        return None
-
-    # Check seller hasn't already responded
-    result = await session.execute(
-        select(Offer).where(
-            Offer.request_id == request_id, Offer.seller_id == seller_id
+        pg_insert(Offer)
+        .from_select(
+            [
+                "request_id", "seller_id", "price",
+                "currency", "availability", "comment", "created_at",
+            ],
+            source,
         )
+        .on_conflict_do_nothing(index_elements=["request_id", "seller_id"])
+        .returning(Offer)
     )
-    if result.scalar_one_or_none():
-        return None
-
-    offer = Offer(
-        request_id=request_id,
-        seller_id=seller_id,
-        price=price,
-        currency=currency,
-        availability=availability,
-        comment=comment,
-    )
-    session.add(offer)
-    await session.commit()
-    await session.refresh(offer)
-    return offer
+    offer = result.scalar_one_or_none()
+    if offer:
+        return OfferResult(offer)
+    # Nothing inserted: find out why (only on the failure path)
+    reason = await check_can_offer(session, request_id, seller_id)
+    return OfferResult(None, reason or "already_responded")
 
 
 async def get_offer_with_seller(
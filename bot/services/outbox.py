@@ -0,0 +1,401 @@
+import asyncio
+import logging
+import pathlib
+import random
+from datetime import datetime, timedelta, timezone
+
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+from aiogram.types import FSInputFile, InlineKeyboardMarkup, InputMediaPhoto
+from sqlalchemy import and_, delete, exists, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload
+
+from bot.config import settings
+from bot.db.engine import background_session
+from bot.db.models import OutboxMessage, OutboxStatusEnum, PhotoBlob, RequestPhoto
+from bot.services.fanout import deliver, fan_out, percentile
+
+logger = logging.getLogger(__name__)
+
+UPLOADS_DIR = pathlib.Path(__file__).resolve().parent.parent.parent / "uploads"
+
+# Errors that will not go away on retry (bot blocked, chat not found, bad markup)
+_PERMANENT_ERRORS = (TelegramForbiddenError, TelegramBadRequest)
+
+
+def _message_payload(
+    text: str,
+    reply_markup: InlineKeyboardMarkup | None,
+    photo_ids: list[int] | None,
+) -> dict:
+    payload: dict = {"text": text}
+    if reply_markup is not None:
+        payload["reply_markup"] = reply_markup.model_dump(exclude_none=True)
+    if photo_ids:
+        payload["photo_ids"] = list(photo_ids)
+    return payload
+
+
+def enqueue_message(
+    session: AsyncSession,
+    chat_id: int,
+    text: str,
+    reply_markup: InlineKeyboardMarkup | None = None,
+    photo_ids: list[int] | None = None,
+    request_id: int | None = None,
+) -> OutboxMessage:
+    """Add a message to the outbox. It is sent once the session commits."""
+    row = OutboxMessage(
+        chat_id=chat_id,
+        request_id=request_id,
+        method="send_message",
+        payload=_message_payload(text, reply_markup, photo_ids),
+    )
+    session.add(row)
+    return row
+
+
+def enqueue_many(
+    session: AsyncSession,
+    chat_ids: list[int],
+    text: str,
+    reply_markup: InlineKeyboardMarkup | None = None,
+    photo_ids: list[int] | None = None,
+    request_id: int | None = None,
+) -> None:
+    """Queue the same message for many chats; the payload is built only once."""
+    payload = _message_payload(text, reply_markup, photo_ids)
+    session.add_all(
+        OutboxMessage(
+            chat_id=chat_id,
+            request_id=request_id,
+            method="send_message",
+            payload=payload,
+        )
+        for chat_id in chat_ids
+    )
+
+
+def enqueue_fan_out(session: AsyncSession, request_id: int) -> OutboxMessage:
+    """Schedule the seller fan-out for a request. The workers expand it into
+    one message per seller via notify_sellers.
+    """
+    row = OutboxMessage(request_id=request_id, method="notify_sellers", payload={})
+    session.add(row)
+    return row
+
+
+async def enqueue_offer_card(
+    session: AsyncSession, request_id: int, chat_id: int
+) -> None:
+    """Schedule a refresh of the client's offer card after the coalescing window.
+    A pending refresh that has not been picked up yet already covers this offer.
+    """
+    await session.execute(
+        pg_insert(OutboxMessage)
+        .values(
+            chat_id=chat_id,
+            request_id=request_id,
+            method="offer_card",
+            payload={},
+            status=OutboxStatusEnum.pending,
+            attempts=0,
+            next_attempt_at=datetime.now(timezone.utc)
+            + timedelta(seconds=settings.OFFER_CARD_WINDOW_SECONDS),
+        )
+        .on_conflict_do_nothing()
+    )
+
+
+async def get_fan_out_status(session: AsyncSession, request_id: int) -> dict:
+    result = await session.execute(
+        select(OutboxMessage.method, OutboxMessage.status, func.count())
+        .where(
+            OutboxMessage.request_id == request_id,
+            OutboxMessage.method.in_(("notify_sellers", "send_message")),
+        )
+        .group_by(OutboxMessage.method, OutboxMessage.status)
+    )
+    scheduled = False
+    counts = {status: 0 for status in OutboxStatusEnum}
+    for method, status, count in result.all():
+        if method == "notify_sellers":
+            scheduled = scheduled or status == OutboxStatusEnum.pending
+        else:
+            counts[status] += count
+
+    # Delivery latency of this request's seller notifications so far
+    latencies: list[float] = []
+    if counts[OutboxStatusEnum.sent]:
+        result = await session.execute(
+            select(OutboxMessage.created_at, OutboxMessage.sent_at).where(
+                OutboxMessage.request_id == request_id,
+                OutboxMessage.method == "send_message",
+                OutboxMessage.status == OutboxStatusEnum.sent,
+            )
+        )
+        latencies = sorted(
+            (sent_at - created_at).total_seconds() for created_at, sent_at in result.all()
+        )
+    return {
+        "scheduled": scheduled,
+        "sellers_total": sum(counts.values()),
+        "notified": counts[OutboxStatusEnum.sent],
+        "pending": counts[OutboxStatusEnum.pending],
+        "failed": counts[OutboxStatusEnum.failed],
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+    }
+
+
+async def claim_batch(session: AsyncSession, limit: int) -> list[OutboxMessage]:
+    """Claim due rows. Claimed rows are hidden from other workers for the lease
+    period, so a crashed worker's rows are picked up again once it expires.
+    """
+    now = datetime.now(timezone.utc)
+    # Offer cards are one shared message per request: while one refresh is
+    # leased to a worker, no other refresh of that request may start
+    other = aliased(OutboxMessage)
+    card_in_flight = exists().where(
+        other.request_id == OutboxMessage.request_id,
+        other.method == "offer_card",
+        other.status == OutboxStatusEnum.pending,
+        other.attempts > 0,
+        # Leased rows; a refresh waiting out a long retry backoff doesn't block
+        other.next_attempt_at > now,
+        other.next_attempt_at <= now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS),
+    )
+    result = await session.execute(
+        select(OutboxMessage)
+        .where(
+            OutboxMessage.status == OutboxStatusEnum.pending,
+            OutboxMessage.next_attempt_at <= now,
+            ~and_(OutboxMessage.method == "offer_card", card_in_flight),
+        )
+        .order_by(OutboxMessage.next_attempt_at, OutboxMessage.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    rows = []
+    cards: set[int] = set()
+    for row in result.scalars().all():
+        if row.method == "offer_card":
+            if row.request_id in cards:
+                continue  # left due; claimed after this refresh finishes
+            cards.add(row.request_id)
+        rows.append(row)
+    lease_until = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+    for row in rows:
+        row.attempts += 1
+        row.next_attempt_at = lease_until
+    await session.commit()
+    return rows
+
+
+async def purge_sent(session: AsyncSession) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.OUTBOX_KEEP_SENT_DAYS)
+    result = await session.execute(
+        delete(OutboxMessage).where(
+            OutboxMessage.status == OutboxStatusEnum.sent,
+            OutboxMessage.sent_at < cutoff,
+        )
+    )
+    await session.commit()
+    return result.rowcount
+
+
+def _retry_delay(row: OutboxMessage, exc: Exception) -> float:
+    if isinstance(exc, TelegramRetryAfter):
+        return float(exc.retry_after)
+    delay = settings.OUTBOX_RETRY_BASE * 2 ** (row.attempts - 1)
+    return min(delay, settings.OUTBOX_RETRY_MAX) * random.uniform(0.8, 1.2)
+
+
+class _Batch:
+    """Shared state for one claimed batch: request photos and their upload locks."""
+
+    def __init__(self, photos: dict[int, RequestPhoto]):
+        self.photos = photos
+        self.upload_locks: dict[tuple[int, ...], asyncio.Lock] = {}
+        self.outcomes: dict[int, dict] = {}
+
+    async def send_photos(self, chat_id: int, photo_ids: list[int]) -> None:
+        from bot.loader import bot
+
+        # Blobs are shared by identical photos, so their file_id is reused everywhere
+        photos = [
+            self.photos[pid].blob or self.photos[pid]
+            for pid in photo_ids
+            if pid in self.photos
+        ]
+        photos = [
+            photo
+            for photo in photos
+            if photo.telegram_file_id or (UPLOADS_DIR / photo.file_path).exists()
+        ]
+        if not photos:
+            return
+
+        def _media() -> list[InputMediaPhoto]:
+            return [
+                InputMediaPhoto(
+                    media=photo.telegram_file_id
+                    or FSInputFile(UPLOADS_DIR / photo.file_path)
+                )
+                for photo in photos
+            ]
+
+        if not all(photo.telegram_file_id for photo in photos):
+            # Only the first recipient uploads from disk; the rest wait for file_ids
+            lock = self.upload_locks.setdefault(tuple(photo_ids), asyncio.Lock())
+            async with lock:
+                if not all(photo.telegram_file_id for photo in photos):
+                    messages = await deliver(
+                        chat_id,
+                        lambda: bot.send_media_group(chat_id, _media()),
+                        cost=len(photos),
+                    )
+                    for photo, msg in zip(photos, messages):
+                        photo.telegram_file_id = msg.photo[-1].file_id
+                    await _save_file_ids(photos)
+                    return
+
+        await deliver(
+            chat_id,
+            lambda: bot.send_media_group(chat_id, _media()),
+            cost=len(photos),
+        )
+
+    async def send_message(self, row: OutboxMessage) -> None:
+        from bot.loader import bot
+
+        if row.payload.get("photo_ids"):
+            await self.send_photos(row.chat_id, row.payload["photo_ids"])
+            # Don't resend the media group if only the text fails
+            row.payload = {**row.payload, "photo_ids": []}
+
+        reply_markup = None
+        if row.payload.get("reply_markup"):
+            reply_markup = InlineKeyboardMarkup.model_validate(row.payload["reply_markup"])
+        await deliver(
+            row.chat_id,
+            lambda: bot.send_message(
+                row.chat_id, row.payload["text"], reply_markup=reply_markup
+            ),
+        )
+
+    async def send(self, row: OutboxMessage) -> None:
+        from bot.services.notification import notify_sellers, send_offer_card
+
+        try:
+            if row.method == "notify_sellers":
+                await notify_sellers(row.request_id, job_id=row.id)
+            elif row.method == "offer_card":
+                await send_offer_card(row.request_id, row.chat_id)
+            else:
+                await self.send_message(row)
+        except Exception as e:
+            self.outcomes[row.id] = self._failure(row, e)
+            raise
+
+        self.outcomes[row.id] = {
+            "status": OutboxStatusEnum.sent,
+            "sent_at": datetime.now(timezone.utc),
+            "last_error": None,
+        }
+
+    @staticmethod
+    def _failure(row: OutboxMessage, exc: Exception) -> dict:
+        values = {"payload": row.payload, "last_error": str(exc)[:1000]}
+        if (
+            isinstance(exc, _PERMANENT_ERRORS)
+            or row.attempts >= settings.OUTBOX_MAX_ATTEMPTS
+        ):
+            values["status"] = OutboxStatusEnum.failed
+        else:
+            values["next_attempt_at"] = datetime.now(timezone.utc) + timedelta(
+                seconds=_retry_delay(row, exc)
+            )
+        return values
+
+
+async def _save_file_ids(photos: list[PhotoBlob | RequestPhoto]) -> None:
+    async with background_session() as session:
+        for photo in photos:
+            if isinstance(photo, PhotoBlob):
+                stmt = update(PhotoBlob).where(PhotoBlob.sha256 == photo.sha256)
+            else:
+                stmt = update(RequestPhoto).where(RequestPhoto.id == photo.id)
+            await session.execute(stmt.values(telegram_file_id=photo.telegram_file_id))
+        await session.commit()
+
+
+async def process_batch(rows: list[OutboxMessage]) -> None:
+    photo_ids = {pid for row in rows for pid in row.payload.get("photo_ids", [])}
+    photos: dict[int, RequestPhoto] = {}
+    if photo_ids:
+        async with background_session() as session:
+            result = await session.execute(
+                select(RequestPhoto)
+                .options(joinedload(RequestPhoto.blob))
+                .where(RequestPhoto.id.in_(photo_ids))
+            )
+            photos = {photo.id: photo for photo in result.scalars().all()}
+
+    batch = _Batch(photos)
+    report = await fan_out(rows, batch.send)
+
+    async with background_session() as session:
+        for row_id, values in batch.outcomes.items():
+            await session.execute(
+                update(OutboxMessage).where(OutboxMessage.id == row_id).values(**values)
+            )
+        await session.commit()
+
+    logger.info(
+        "Outbox batch: %d/%d sent, %d failed",
+        report["sent"], report["total"], report["failed"],
+    )
+
+    # Seller fan-out latency per request: enqueued by notify_sellers -> delivered
+    by_request: dict[int, list[float]] = {}
+    for row in rows:
+        values = batch.outcomes.get(row.id)
+        if row.method == "send_message" and row.request_id and values and "sent_at" in values:
+            by_request.setdefault(row.request_id, []).append(
+                (values["sent_at"] - row.created_at).total_seconds()
+            )
+    for request_id, latencies in by_request.items():
+        latencies.sort()
+        logger.info(
+            "Fan-out request #%d: %d sent (p50=%.2fs p95=%.2fs p99=%.2fs)",
+            request_id, len(latencies),
+            percentile(latencies, 50), percentile(latencies, 95), percentile(latencies, 99),
+        )
+
+
+async def outbox_worker(worker_id: int) -> None:
+    while True:
+        try:
+            async with background_session() as session:
+                rows = await claim_batch(session, settings.OUTBOX_BATCH_SIZE)
+            if rows:
+                # Jobs may have queued new rows; look again before sleeping
+                await process_batch(rows)
+                continue
+        except Exception as e:
+            logger.error("Outbox worker %d error: %s", worker_id, e)
+        await asyncio.sleep(settings.OUTBOX_POLL_INTERVAL)
+
+
+async def run_outbox_workers() -> None:
+    """Background task: deliver queued messages with a pool of workers."""
+    await asyncio.gather(
+        *(outbox_worker(i) for i in range(settings.OUTBOX_WORKERS))
+    )
@@ -0,0 +1,91 @@
+import logging
+
+from sqlalchemy import delete, exists, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.db.models import PhotoBlob, RequestPhoto
+from bot.services.outbox import UPLOADS_DIR
+
+logger = logging.getLogger(__name__)
+
+
+async def get_blobs(session: AsyncSession, hashes: list[str]) -> dict[str, PhotoBlob]:
+    result = await session.execute(select(PhotoBlob).where(PhotoBlob.sha256.in_(hashes)))
+    return {blob.sha256: blob for blob in result.scalars().all()}
+
+
+async def add_blob_ref(
+    session: AsyncSession,
+    sha256: str,
+    file_path: str,
+    thumb_path: str,
+    width: int,
+    height: int,
+    size_bytes: int,
+) -> None:
+    """Create the blob, or count one more reference if it already exists."""
+    stmt = pg_insert(PhotoBlob).values(
+        sha256=sha256,
+        file_path=file_path,
+        thumb_path=thumb_path,
+        width=width,
+        height=height,
+        size_bytes=size_bytes,
+        ref_count=1,
+    )
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[PhotoBlob.sha256],
+            set_={"ref_count": PhotoBlob.ref_count + 1},
+        )
+    )
+
+
+async def release_blob_ref(session: AsyncSession, sha256: str) -> None:
+    """Count one reference less, in the transaction that deletes a RequestPhoto
+    pointing at the blob. purge_unreferenced_blobs removes it once none remain.
+    """
+    await session.execute(
+        update(PhotoBlob)
+        .where(PhotoBlob.sha256 == sha256)
+        .values(ref_count=PhotoBlob.ref_count - 1)
+    )
+
+
+async def purge_unreferenced_blobs(session: AsyncSession, chunk_size: int = 500) -> int:
+    """Delete blobs no RequestPhoto uses any more, with their files, in chunks.
+    Returns the number deleted.
+
+    Files are removed while the rows are still locked: an upload of the same
+    bytes waits in add_blob_ref, then creates a fresh blob and writes the
+    files again (see create_request).
+    """
+    total = 0
+    while True:
+        unused = (
+            select(PhotoBlob.sha256)
+            .where(
+                PhotoBlob.ref_count <= 0,
+                ~exists().where(RequestPhoto.blob_sha256 == PhotoBlob.sha256),
+            )
+            .limit(chunk_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = await session.execute(
+            delete(PhotoBlob)
+            .where(PhotoBlob.sha256.in_(unused.scalar_subquery()))
+            .returning(PhotoBlob.file_path, PhotoBlob.thumb_path)
+            .execution_options(synchronize_session=False)
+        )
+        deleted = result.all()
+        for file_path, thumb_path in deleted:
+            for path in (file_path, thumb_path):
+                try:
+                    (UPLOADS_DIR / path).unlink(missing_ok=True)
+                except OSError as e:
+                    logger.warning("Could not delete %s: %s", path, e)
+        await session.commit()
+        total += len(deleted)
+        if len(deleted) < chunk_size:
+            return total
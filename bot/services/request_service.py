@@ -1,28 +1,81 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import func, select
+from sqlalchemy import Select, func, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from bot.db.models import Offer, Request, RequestStatusEnum
 
 
+PAGE_SIZE = 10
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(created_at: datetime, request_id: int) -> str:
+    """Compact (created_at, id) position, short enough for callback_data."""
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return f"{(created_at - _EPOCH) // timedelta(microseconds=1)}.{request_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    micros, request_id = cursor.split(".")
+    return _EPOCH + timedelta(microseconds=int(micros)), int(request_id)
+
+
+def _keyset(stmt: Select, cursor: str | None, direction: str, limit: int) -> Select:
+    """Page on (created_at, id) newest first. "next" continues after the
+    cursor, "prev" walks back before it. One extra row tells if there's more.
+    """
+    key = tuple_(Request.created_at, Request.id)
+    if cursor:
+        position = tuple_(*decode_cursor(cursor))
+        stmt = stmt.where(key > position if direction == "prev" else key < position)
+    if direction == "prev":
+        stmt = stmt.order_by(Request.created_at.asc(), Request.id.asc())
+    else:
+        stmt = stmt.order_by(Request.created_at.desc(), Request.id.desc())
+    return stmt.limit(limit + 1)
+
+
+def _page(items: list[dict], cursor: str | None, direction: str, limit: int) -> dict:
+    more = len(items) > limit
+    items = items[:limit]
+    if direction == "prev":
+        items.reverse()
+        has_prev, has_next = more, True
+    else:
+        has_prev, has_next = cursor is not None, more
+    return {
+        "items": items,
+        "prev": encode_cursor(items[0]["created_at"], items[0]["id"])
+        if items and has_prev else None,
+        "next": encode_cursor(items[-1]["created_at"], items[-1]["id"])
+        if items and has_next else None,
+    }
+
+
 async def get_user_requests(
-    session: AsyncSession, user_id: int
-) -> list[dict]:
+    session: AsyncSession,
+    user_id: int,
+    cursor: str | None = None,
+    direction: str = "next",
+    limit: int = PAGE_SIZE,
+) -> dict:
+    # Offer counts come from the same query instead of one count per request
     result = await session.execute(
-        select(Request)
-        .where(Request.client_id == user_id, Request.status == RequestStatusEnum.active)
-        .order_by(Request.created_at.desc())
+        _keyset(
+            select(Request, func.count(Offer.id))
+            .outerjoin(Offer, Offer.request_id == Request.id)
+            .where(Request.client_id == user_id, Request.status == RequestStatusEnum.active)
+            .group_by(Request.id),
+            cursor, direction, limit,
+        )
     )
-    requests = result.scalars().all()
 
     items = []
-    for req in requests:
-        offer_count_result = await session.execute(
-            select(func.count()).select_from(Offer).where(Offer.request_id == req.id)
-        )
-        offer_count = offer_count_result.scalar() or 0
+    for req, offer_count in result.all():
         items.append(
             {
                 "id": req.id,
@@ -34,7 +87,49 @@ async def get_user_requests(
                 "created_at": req.created_at,
             }
         )
-    return items
+    return _page(items, cursor, direction, limit)
+
+
+async def get_seller_requests(
+    session: AsyncSession,
+    seller_id: int,
+    brands: frozenset[str],
+    cursor: str | None = None,
+    direction: str = "next",
+    limit: int = PAGE_SIZE,
+) -> dict:
+    """Active requests for the seller's brands that they haven't answered yet."""
+    answered = (
+        select(Offer.id)
+        .where(Offer.request_id == Request.id, Offer.seller_id == seller_id)
+        .correlate(Request)
+        .exists()
+    )
+    result = await session.execute(
+        _keyset(
+            select(Request).where(
+                Request.brand.in_(brands),
+                Request.status == RequestStatusEnum.active,
+                ~answered,
+            ),
+            cursor, direction, limit,
+        )
+    )
+
+    items = []
+    for req in result.scalars().all():
+        items.append(
+            {
+                "id": req.id,
+                "brand": req.brand,
+                "model": req.model,
+                "year": req.year,
+                "description": req.description,
+                "part_type": req.part_type.value,
+                "created_at": req.created_at,
+            }
+        )
+    return _page(items, cursor, direction, limit)
 
 
 async def get_request_detail(
@@ -90,16 +185,40 @@ async def close_request(session: AsyncSession, request_id: int) -> bool:
     return True
 
 
-async def expire_old_requests(session: AsyncSession) -> int:
+async def expire_old_requests(session: AsyncSession, chunk_size: int = 1000) -> int:
+    """Mark overdue active requests as expired in set-based chunks,
+    without loading them into the session. Returns the number expired.
+    """
     now = datetime.now(timezone.utc)
+    total = 0
+    while True:
+        due = (
+            select(Request.id)
+            .where(
+                Request.status == RequestStatusEnum.active,
+                Request.expires_at < now,
+            )
+            .limit(chunk_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = await session.execute(
+            update(Request)
+            .where(Request.id.in_(due.scalar_subquery()))
+            .values(status=RequestStatusEnum.expired)
+            .returning(Request.id)
+            .execution_options(synchronize_session=False)
+        )
+        expired = result.scalars().all()
+        await session.commit()
+        total += len(expired)
+        if len(expired) < chunk_size:
+            return total
+
+
+async def next_expiry(session: AsyncSession) -> datetime | None:
     result = await session.execute(
-        select(Request).where(
-            Request.status == RequestStatusEnum.active,
-            Request.expires_at < now,
+        select(func.min(Request.expires_at)).where(
+            Request.status == RequestStatusEnum.active
         )
     )
-    expired = result.scalars().all()
-    for req in expired:
-        req.status = RequestStatusEnum.expired
-    await session.commit()
-    return len(expired)
+    return result.scalar()
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+from typing import NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.config import settings
+from bot.db.engine import background_session
+from bot.db.models import SellerBrand, User
+
+logger = logging.getLogger(__name__)
+
+
+class SellerEntry(NamedTuple):
+    seller_id: int
+    telegram_id: int
+    language: str
+
+
+class SellerIndex:
+    """Process-local brand -> subscribed sellers map.
+
+    Handlers that change a seller's brands or language update it directly and
+    publish the change; other processes re-read that seller (refresh_seller)
+    when the notice arrives. reconcile() periodically rebuilds it from the
+    database in case a notice was missed.
+    """
+
+    def __init__(self):
+        self._by_brand: dict[str, tuple[SellerEntry, ...]] = {}
+        self._brands: dict[int, frozenset[str]] = {}
+        self._entries: dict[int, SellerEntry] = {}
+        self._version = 0
+        self._load_lock = asyncio.Lock()
+        self._refresh_lock = asyncio.Lock()
+        self.loaded = False
+
+    @staticmethod
+    async def _fetch(session: AsyncSession, seller_id: int | None = None) -> tuple[dict, dict]:
+        stmt = (
+            select(User.id, User.telegram_id, User.language, SellerBrand.brand)
+            .join(SellerBrand, SellerBrand.seller_id == User.id)
+        )
+        if seller_id is not None:
+            stmt = stmt.where(User.id == seller_id)
+        result = await session.execute(stmt)
+        entries: dict[int, SellerEntry] = {}
+        brands: dict[int, set[str]] = {}
+        for seller_id, telegram_id, language, brand in result.all():
+            lang = language.value if language else "ru"
+            entries[seller_id] = SellerEntry(seller_id, telegram_id, lang)
+            brands.setdefault(seller_id, set()).add(brand)
+        return entries, {sid: frozenset(b) for sid, b in brands.items()}
+
+    def _rebuild(self, entries: dict, brands: dict) -> None:
+        by_brand: dict[str, list[SellerEntry]] = {}
+        for seller_id, seller_brands in brands.items():
+            for brand in seller_brands:
+                by_brand.setdefault(brand, []).append(entries[seller_id])
+        self._entries = entries
+        self._brands = brands
+        self._by_brand = {brand: tuple(items) for brand, items in by_brand.items()}
+
+    async def load(self, session: AsyncSession) -> None:
+        entries, brands = await self._fetch(session)
+        self._rebuild(entries, brands)
+        self._version += 1
+        self.loaded = True
+        logger.info(
+            "Seller index loaded: %d sellers, %d brands",
+            len(self._entries), len(self._by_brand),
+        )
+
+    async def _ensure_loaded(self, session: AsyncSession) -> None:
+        if not self.loaded:
+            async with self._load_lock:
+                if not self.loaded:
+                    await self.load(session)
+
+    async def sellers(self, session: AsyncSession, brand: str) -> tuple[SellerEntry, ...]:
+        await self._ensure_loaded(session)
+        return self._by_brand.get(brand, ())
+
+    async def brands(self, session: AsyncSession, seller_id: int) -> frozenset[str]:
+        await self._ensure_loaded(session)
+        return self._brands.get(seller_id, frozenset())
+
+    def _replace_brands(self, seller_id: int, new: frozenset[str]) -> None:
+        old = self._brands.get(seller_id, frozenset())
+        entry = self._entries.get(seller_id)
+        for brand in old | new:
+            items = [e for e in self._by_brand.get(brand, ()) if e.seller_id != seller_id]
+            if brand in new and entry:
+                items.append(entry)
+            if items:
+                self._by_brand[brand] = tuple(items)
+            else:
+                self._by_brand.pop(brand, None)
+        if new:
+            self._brands[seller_id] = new
+        else:
+            self._brands.pop(seller_id, None)
+            self._entries.pop(seller_id, None)
+
+    def set_seller(
+        self, seller_id: int, telegram_id: int, language: str, brands: set[str]
+    ) -> None:
+        """Call after committing a seller's new brand list."""
+        self._entries[seller_id] = SellerEntry(seller_id, telegram_id, language)
+        self._replace_brands(seller_id, frozenset(brands))
+        self._version += 1
+
+    def set_language(self, seller_id: int, language: str) -> None:
+        """Call after committing a user's language change; no-op for non-sellers."""
+        entry = self._entries.get(seller_id)
+        if entry is None or entry.language == language:
+            return
+        self._entries[seller_id] = entry._replace(language=language)
+        self._replace_brands(seller_id, self._brands.get(seller_id, frozenset()))
+        self._version += 1
+
+    async def refresh_seller(self, session: AsyncSession, seller_id: int) -> None:
+        """Re-read one user's brands and language after another process changed
+        them; drops the user from the index if they have no brands.
+        """
+        if not self.loaded:
+            return  # The first load will read it
+        # Notices for the same seller may arrive back to back; apply in order
+        async with self._refresh_lock:
+            entries, brands = await self._fetch(session, seller_id)
+            if seller_id in entries:
+                self._entries[seller_id] = entries[seller_id]
+            self._replace_brands(seller_id, brands.get(seller_id, frozenset()))
+            self._version += 1
+
+    async def reconcile(self, session: AsyncSession) -> None:
+        """Rebuild from the database and log if the in-memory copy had drifted."""
+        version = self._version
+        entries, brands = await self._fetch(session)
+        if version != self._version:
+            # Updated locally while we were reading; the snapshot may be stale
+            return
+        if entries != self._entries or brands != self._brands:
+            logger.warning(
+                "Seller index drift: %d sellers in memory, %d in database",
+                len(self._entries), len(entries),
+            )
+            self._rebuild(entries, brands)
+            self._version += 1
+        self.loaded = True
+
+
+seller_index = SellerIndex()
+
+
+_reconcile_task: asyncio.Task | None = None
+
+
+def start_reconcile_task() -> asyncio.Task:
+    """Start reconcile_seller_index_loop once per process (the bot and the
+    webhook app may both ask for it when they share one).
+    """
+    global _reconcile_task
+    if _reconcile_task is None or _reconcile_task.done():
+        _reconcile_task = asyncio.create_task(reconcile_seller_index_loop())
+    return _reconcile_task
+
+
+async def reconcile_seller_index_loop():
+    """Background task: periodically check the seller index against the database."""
+    while True:
+        await asyncio.sleep(settings.SELLER_INDEX_RECONCILE_SECONDS)
+        try:
+            async with background_session() as session:
+                await seller_index.reconcile(session)
+        except Exception as e:
+            logger.error("Error reconciling seller index: %s", e)
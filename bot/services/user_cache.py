@@ -0,0 +1,78 @@
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.config import settings
+from bot.db.models import RoleEnum, User
+
+
+class UserProfile(NamedTuple):
+    id: int
+    telegram_id: int
+    role: RoleEnum | None
+    language: str
+
+
+class UserCache:
+    """Bounded LRU of telegram_id -> UserProfile with a TTL.
+
+    Handlers that change a user's role or language call invalidate() after
+    committing and publish the change, so other processes drop their copy too
+    (bot.services.cache_sync); the TTL bounds staleness if that notice is lost.
+    Users without a role yet are not cached, so registration is never delayed.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: OrderedDict[int, tuple[float, UserProfile]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, session: AsyncSession, telegram_id: int) -> UserProfile | None:
+        item = self._items.get(telegram_id)
+        if item is not None:
+            expires_at, profile = item
+            if expires_at > time.monotonic():
+                self._items.move_to_end(telegram_id)
+                self.hits += 1
+                return profile
+            del self._items[telegram_id]
+
+        self.misses += 1
+        result = await session.execute(
+            select(User.id, User.telegram_id, User.role, User.language)
+            .where(User.telegram_id == telegram_id)
+        )
+        row = result.one_or_none()
+        if row is None:
+            return None
+        profile = UserProfile(
+            row.id, row.telegram_id, row.role,
+            row.language.value if row.language else "ru",
+        )
+        if profile.role is None:
+            # Still registering: the role is about to change, maybe in another process
+            return profile
+        self._items[telegram_id] = (time.monotonic() + self.ttl, profile)
+        if len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+        return profile
+
+    def invalidate(self, telegram_id: int) -> None:
+        """Call after committing a change to the user's role or language."""
+        self._items.pop(telegram_id, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+user_cache = UserCache(
+    max_size=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,128 @@
+import json
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import TYPE_CHECKING, Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bot.config import settings
+from bot.db.engine import async_session
+from bot.db.models import FsmRecord
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+_compact_dumps = partial(json.dumps, separators=(",", ":"), ensure_ascii=False)
+
+
+# (storage key, (state, data)) read by the last get_state() in this task.
+# aiogram's FSM middleware calls get_state() at the start of every update, so
+# a handler's get_data() right after it reuses the same row instead of
+# querying again. Values are immutable: tasks spawned per update copy it.
+_current: ContextVar[tuple[str, tuple[str | None, dict]] | None] = ContextVar(
+    "fsm_current", default=None
+)
+
+
+class PostgresStorage(BaseStorage):
+    """FSM storage in the fsm_states table, one row per chat/user key.
+    Rows expire `ttl` seconds after the last write; expired rows read as empty
+    and are deleted by purge_expired_fsm.
+    """
+
+    def __init__(self, ttl: int, session_factory: async_sessionmaker = async_session):
+        self.ttl = timedelta(seconds=ttl)
+        self.session_factory = session_factory
+        self.key_builder = DefaultKeyBuilder(with_destiny=True)
+
+    async def _upsert(self, key: StorageKey, **values: Any) -> None:
+        built = self.key_builder.build(key)
+        values["expires_at"] = datetime.now(timezone.utc) + self.ttl
+        async with self.session_factory() as session:
+            await session.execute(
+                pg_insert(FsmRecord)
+                .values(key=built, **values)
+                .on_conflict_do_update(index_elements=[FsmRecord.key], set_=values)
+            )
+            await session.commit()
+
+        current = _current.get()
+        if current is not None and current[0] == built:
+            state, data = current[1]
+            _current.set(
+                (built, (values.get("state", state), values.get("data", data)))
+            )
+
+    async def _get(self, key: StorageKey, fresh: bool) -> tuple[str | None, dict]:
+        """State and data in one query; `fresh` skips the row cached for this task."""
+        built = self.key_builder.build(key)
+        current = _current.get()
+        if not fresh and current is not None and current[0] == built:
+            return current[1]
+
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(FsmRecord.state, FsmRecord.data).where(
+                    FsmRecord.key == built,
+                    FsmRecord.expires_at > datetime.now(timezone.utc),
+                )
+            )
+            row = result.one_or_none()
+        record = (row.state, row.data) if row else (None, {})
+        _current.set((built, record))
+        return record
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._upsert(key, state=state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        # Start of an update: always read the row
+        state, _ = await self._get(key, fresh=True)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._upsert(key, data=dict(data))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, data = await self._get(key, fresh=False)
+        return dict(data)
+
+    async def close(self) -> None:
+        pass
+
+
+async def purge_expired_fsm(session: AsyncSession) -> int:
+    result = await session.execute(
+        delete(FsmRecord).where(FsmRecord.expires_at <= datetime.now(timezone.utc))
+    )
+    await session.commit()
+    return result.rowcount
+
+
+def redis_storage(redis: "Redis") -> BaseStorage:
+    from aiogram.fsm.storage.redis import RedisStorage
+
+    return RedisStorage(
+        redis,
+        state_ttl=settings.FSM_TTL_SECONDS,
+        data_ttl=settings.FSM_TTL_SECONDS,
+        json_dumps=_compact_dumps,
+    )
+
+
+def create_storage() -> BaseStorage:
+    if settings.FSM_STORAGE == "redis":
+        from redis.asyncio import Redis
+
+        return redis_storage(Redis.from_url(settings.REDIS_URL))
+    if settings.FSM_STORAGE == "postgres":
+        return PostgresStorage(ttl=settings.FSM_TTL_SECONDS)
+    if settings.FSM_STORAGE != "memory":
+        raise ValueError(f"Unknown FSM_STORAGE: {settings.FSM_STORAGE!r}")
+    return MemoryStorage()
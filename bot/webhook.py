@@ -0,0 +1,71 @@
+import asyncio
+import logging
+
+from aiogram.types import Update
+
+from bot.config import settings
+from bot.db.engine import background_session
+from bot.handlers import register_routers
+from bot.loader import bot, dp
+from bot.services.cache_sync import start_listen_task
+from bot.services.seller_index import seller_index, start_reconcile_task
+
+logger = logging.getLogger(__name__)
+
+# Filled by the webhook route, drained by update_worker tasks. When it is
+# full the route answers 503 and Telegram redelivers the update later.
+update_queue: asyncio.Queue[Update] = asyncio.Queue(maxsize=settings.WEBHOOK_QUEUE_SIZE)
+
+_workers: list[asyncio.Task] = []
+
+
+async def update_worker(worker_id: int) -> None:
+    while True:
+        update = await update_queue.get()
+        try:
+            await dp.feed_update(bot, update)
+        except Exception as e:
+            logger.error("Update worker %d error on update %s: %s", worker_id, update.update_id, e)
+        finally:
+            update_queue.task_done()
+
+
+async def start_update_workers() -> None:
+    """Prepare the dispatcher in this process and start the queue consumers,
+    plus the cache sync listener and the seller index reconcile loop, which
+    bring other workers' brand and language edits into this process.
+    Runs on app startup, so every uvicorn worker process gets its own.
+    """
+    if not dp.sub_routers:
+        register_routers(dp)
+    if not seller_index.loaded:
+        async with background_session() as session:
+            await seller_index.load(session)
+    _workers.extend(
+        asyncio.create_task(update_worker(i)) for i in range(settings.WEBHOOK_WORKERS)
+    )
+    _workers.append(start_reconcile_task())
+    listen_task = start_listen_task()
+    if listen_task is not None:
+        _workers.append(listen_task)
+    logger.info("Started %d webhook update workers", settings.WEBHOOK_WORKERS)
+
+
+async def stop_update_workers(timeout: float = 10.0) -> None:
+    """Give queued updates a chance to finish, then cancel the consumers."""
+    try:
+        await asyncio.wait_for(update_queue.join(), timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Dropping %d queued updates on shutdown", update_queue.qsize())
+    for task in _workers:
+        task.cancel()
+    _workers.clear()
+
+
+async def set_webhook() -> None:
+    await bot.set_webhook(
+        settings.WEBHOOK_URL.rstrip("/") + settings.WEBHOOK_PATH,
+        secret_token=settings.WEBHOOK_SECRET,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+    logger.info("Webhook set to %s%s", settings.WEBHOOK_URL, settings.WEBHOOK_PATH)
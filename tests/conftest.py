@@ -0,0 +1,7 @@
+import os
+
+# Settings are read at import time; tests run against SQLite.
+# Install test dependencies with: pip install -r requirements-dev.txt
+os.environ.setdefault("BOT_TOKEN", "123:test")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+os.environ.setdefault("WEBAPP_URL", "https://example.com")
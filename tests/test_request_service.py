@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from bot.db.models import (
+    AvailabilityEnum,
+    Base,
+    CurrencyEnum,
+    Offer,
+    PartTypeEnum,
+    Request,
+    RoleEnum,
+    User,
+)
+from bot.services.request_service import get_user_requests
+
+
+async def _user_requests_query_count(n: int) -> tuple[int, list[dict]]:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with session_factory() as session:
+        client = User(telegram_id=1, role=RoleEnum.client)
+        sellers = [User(telegram_id=100 + i, role=RoleEnum.seller) for i in range(3)]
+        session.add_all([client, *sellers])
+        await session.flush()
+        created = datetime.now(timezone.utc)
+        for i in range(n):
+            req = Request(
+                client_id=client.id,
+                brand="BMW",
+                model="X5",
+                year=2015,
+                description=f"part {i}",
+                part_type=PartTypeEnum.original,
+                created_at=created - timedelta(minutes=i),
+            )
+            session.add(req)
+            await session.flush()
+            for seller in sellers[: i % 4]:
+                session.add(
+                    Offer(
+                        request_id=req.id,
+                        seller_id=seller.id,
+                        price=100,
+                        currency=CurrencyEnum.usd,
+                        availability=AvailabilityEnum.in_stock,
+                    )
+                )
+        await session.commit()
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        async with session_factory() as session:
+            page = await get_user_requests(session, client.id, limit=n)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+        await engine.dispose()
+    return len(statements), page["items"]
+
+
+@pytest.mark.parametrize("n", [1, 30])
+def test_get_user_requests_single_query(n):
+    queries, items = asyncio.run(_user_requests_query_count(n))
+
+    assert queries == 1
+    assert len(items) == n
+    assert [item["offer_count"] for item in items] == [i % 4 for i in range(n)]
@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime, timezone
+
+import fakeredis
+import pytest
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+from sqlalchemy import event, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import bot.storage
+from bot.db.models import Base, FsmRecord
+from bot.storage import PostgresStorage, purge_expired_fsm, redis_storage
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+
+class Form(StatesGroup):
+    name = State()
+
+
+async def _sqlite_storage(ttl: int):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, PostgresStorage(ttl, async_sessionmaker(engine, expire_on_commit=False))
+
+
+@pytest.fixture(autouse=True)
+def sqlite_upsert(monkeypatch):
+    # Same on_conflict_do_update API as the PostgreSQL construct
+    monkeypatch.setattr(bot.storage, "pg_insert", sqlite_insert)
+
+
+def test_postgres_storage_state_and_data():
+    async def run():
+        engine, storage = await _sqlite_storage(ttl=3600)
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {}
+
+        await storage.set_state(KEY, Form.name)
+        await storage.update_data(KEY, {"brand": "BMW"})
+        await storage.update_data(KEY, {"year": 2015})
+
+        # A new update in another task reads the row back from the database
+        async def read():
+            return await storage.get_state(KEY), await storage.get_data(KEY)
+
+        assert await asyncio.create_task(read()) == (
+            Form.name.state,
+            {"brand": "BMW", "year": 2015},
+        )
+
+        await storage.set_state(KEY, None)
+        await storage.set_data(KEY, {})
+        assert await asyncio.create_task(read()) == (None, {})
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_postgres_storage_one_query_per_update():
+    async def run():
+        engine, storage = await _sqlite_storage(ttl=3600)
+        await storage.set_state(KEY, Form.name)
+        await storage.set_data(KEY, {"brand": "BMW"})
+
+        statements = []
+        event.listen(
+            engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2])
+        )
+
+        async def update():
+            # What the FSM middleware and a handler do for one update
+            await storage.get_state(KEY)
+            return await storage.get_data(KEY)
+
+        assert await asyncio.create_task(update()) == {"brand": "BMW"}
+        assert len(statements) == 1
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_postgres_storage_expiry_and_purge():
+    async def run():
+        engine, storage = await _sqlite_storage(ttl=-1)
+        await storage.set_state(KEY, Form.name)
+        await storage.set_data(KEY, {"brand": "BMW"})
+
+        async def read():
+            return await storage.get_state(KEY), await storage.get_data(KEY)
+
+        assert await asyncio.create_task(read()) == (None, {})
+
+        async with storage.session_factory() as session:
+            assert await purge_expired_fsm(session) == 1
+            assert (await session.execute(select(FsmRecord))).first() is None
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_redis_storage_state_data_and_ttl():
+    async def run():
+        redis = fakeredis.FakeAsyncRedis()
+        storage = redis_storage(redis)
+
+        await storage.set_state(KEY, Form.name)
+        await storage.update_data(KEY, {"brand": "BMW"})
+        assert await storage.get_state(KEY) == Form.name.state
+        assert await storage.get_data(KEY) == {"brand": "BMW"}
+
+        keys = await redis.keys("*")
+        assert len(keys) == 2
+        for key in keys:
+            assert 0 < await redis.ttl(key) <= bot.storage.settings.FSM_TTL_SECONDS
+
+        # Expired keys read as empty
+        for key in keys:
+            await redis.pexpireat(key, datetime.now(timezone.utc))
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {}
+        await storage.close()
+
+    asyncio.run(run())
@@ -1,5 +1,33 @@
-export async function postRequest(formData: FormData): Promise<{ok: boolean; request_id: number}> {
-  const res = await fetch('/api/requests', { method: 'POST', body: formData });
+export async function postRequest(
+  formData: FormData,
+  idempotencyKey: string,
+): Promise<{ok: boolean; request_id: number}> {
+  const res = await fetch('/api/requests', {
+    method: 'POST',
+    body: formData,
+    headers: { 'Idempotency-Key': idempotencyKey },
+  });
   if (!res.ok) throw new Error('Failed to create request');
   return res.json();
 }
+
+export interface RequestStatus {
+  request_id: number;
+  scheduled: boolean;
+  sellers_total: number;
+  notified: number;
+  pending: number;
+  failed: number;
+  // Seconds from fan-out start to delivery, over notified sellers
+  latency_p50: number;
+  latency_p95: number;
+  latency_p99: number;
+}
+
+export async function getRequestStatus(requestId: number, initData: string): Promise<RequestStatus> {
+  const res = await fetch(`/api/requests/${requestId}/status`, {
+    headers: { 'X-Telegram-Init-Data': initData },
+  });
+  if (!res.ok) throw new Error('Failed to load request status');
+  return res.json();
+}
@@ -35,7 +35,7 @@ export default function PhotoUpload({ photos, onChange }: PhotoUploadProps) {
       <input
         ref={inputRef}
         type="file"
-        accept="image/*"
+        accept="image/jpeg,image/png,image/webp"
         style={{ display: 'none' }}
         onChange={handleFile}
       />
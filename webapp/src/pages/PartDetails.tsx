@@ -1,6 +1,6 @@
 import { useState } from 'react';
 import PhotoUpload from '../components/PhotoUpload';
-import { postRequest } from '../api/client';
+import { getRequestStatus, postRequest, type RequestStatus } from '../api/client';
 
 interface PartDetailsProps {
   carData: { brand: string; model: string; year: number };
@@ -8,6 +8,12 @@ interface PartDetailsProps {
 
 type PartType = 'original' | 'duplicate' | 'used';
 
+// Fan-out progress is shown for at most this long before the app closes
+const PROGRESS_TIMEOUT_MS = 15000;
+const PROGRESS_POLL_MS = 1000;
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
 const PART_TYPE_LABELS: Record<PartType, string> = {
   original: 'Оригинал',
   duplicate: 'Дубликат',
@@ -19,9 +25,27 @@ export default function PartDetails({ carData }: PartDetailsProps) {
   const [partType, setPartType] = useState<PartType | ''>('');
   const [photos, setPhotos] = useState<File[]>([]);
   const [submitting, setSubmitting] = useState(false);
+  // One key per form: retries after an error can't create a second request
+  const [idempotencyKey] = useState(() => crypto.randomUUID());
+  const [progress, setProgress] = useState<RequestStatus | null>(null);
 
   const canSubmit = description.trim().length >= 3 && partType !== '';
 
+  // The request is saved at this point; status errors only end the wait early
+  const followFanOut = async (requestId: number) => {
+    const deadline = Date.now() + PROGRESS_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+      try {
+        const status = await getRequestStatus(requestId, window.Telegram.WebApp.initData);
+        setProgress(status);
+        if (!status.scheduled && status.pending === 0) return;
+      } catch {
+        return;
+      }
+      await sleep(PROGRESS_POLL_MS);
+    }
+  };
+
   const handleSubmit = async () => {
     if (!canSubmit || submitting) return;
 
@@ -36,7 +60,8 @@ export default function PartDetails({ carData }: PartDetailsProps) {
       fd.append('init_data', window.Telegram.WebApp.initData);
       photos.forEach((photo) => fd.append('photos', photo));
 
-      await postRequest(fd);
+      const { request_id } = await postRequest(fd, idempotencyKey);
+      await followFanOut(request_id);
       window.Telegram.WebApp.close();
     } catch {
       setSubmitting(false);
@@ -89,6 +114,14 @@ export default function PartDetails({ carData }: PartDetailsProps) {
           'Отправить \u2713'
         )}
       </button>
+
+      {progress && (
+        <p className="progress-text">
+          {progress.scheduled
+            ? 'Ищем продавцов…'
+            : `Отправлено продавцам: ${progress.notified} из ${progress.sellers_total}`}
+        </p>
+      )}
     </div>
   );
 }
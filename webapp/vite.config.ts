@@ -1,8 +1,46 @@
-import { defineConfig } from 'vite';
+import { readdirSync, readFileSync, statSync, writeFileSync } from 'node:fs';
+import { join, resolve } from 'node:path';
+import { brotliCompressSync, constants, gzipSync } from 'node:zlib';
+import { defineConfig, type Plugin } from 'vite';
 import react from '@vitejs/plugin-react';
 
+const COMPRESSIBLE = /\.(js|css|html|svg|json)$/;
+
+// Writes .br and .gz next to each text asset; the API serves them as-is
+function precompress(): Plugin {
+  let outDir = '';
+  return {
+    name: 'precompress',
+    apply: 'build',
+    configResolved(config) {
+      // Relative to the config root, not to wherever vite was started from
+      outDir = resolve(config.root, config.build.outDir);
+    },
+    closeBundle() {
+      const walk = (dir: string) => {
+        for (const name of readdirSync(dir)) {
+          const path = join(dir, name);
+          if (statSync(path).isDirectory()) {
+            walk(path);
+          } else if (COMPRESSIBLE.test(name)) {
+            const source = readFileSync(path);
+            writeFileSync(`${path}.gz`, gzipSync(source, { level: 9 }));
+            writeFileSync(
+              `${path}.br`,
+              brotliCompressSync(source, {
+                params: { [constants.BROTLI_PARAM_QUALITY]: 11 },
+              }),
+            );
+          }
+        }
+      };
+      walk(outDir);
+    },
+  };
+}
+
 export default defineConfig({
-  plugins: [react()],
+  plugins: [react(), precompress()],
   base: '/static/',
   build: {
     outDir: '../api/static',